@@ -7,7 +7,7 @@
 #
 #  see www.salabim.org for more information, the documentation and license information
 
-__version__ = "26.0.2"
+__version__ = "26.0.3"
 import heapq
 import random
 import time
@@ -334,6 +334,150 @@ class ItemFile:
                 yield result
 
 
+class _QuantileSketch:
+    """
+    weighted quantile sketch for stats_only monitors (DDSketch, C. Masson et al., 2019)
+
+    The tallied values are counted (with their weight or duration) in logarithmic buckets, such that
+    the representative value of a bucket differs at most relative_error (relative) from any value in that bucket.
+    So, percentiles have the same relative error bound.
+    Zeroes are counted exactly in a separate bucket, which makes excluding zeroes trivial.
+    The number of buckets only depends on the range of the values, not on the number of tallies.
+    """
+
+    __slots__ = ("gamma", "log_gamma", "positive", "negative", "zero")
+
+    def __init__(self, relative_error):
+        if not 0 < relative_error < 1:
+            raise ValueError(f"percentile_error ({relative_error}) should be > 0 and < 1")
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}  # bucket index i (values in (gamma**(i-1), gamma**i]): weight
+        self.negative = {}  # idem for the absolute value of negative values
+        self.zero = 0
+
+    def add(self, value, weight):
+        if value > 0:
+            i = math.ceil(math.log(value) / self.log_gamma)
+            self.positive[i] = self.positive.get(i, 0) + weight
+        elif value < 0:
+            i = math.ceil(math.log(-value) / self.log_gamma)
+            self.negative[i] = self.negative.get(i, 0) + weight
+        else:
+            self.zero += weight
+
+    def buckets(self, ex0=False):
+        # returns a list of (representative value, weight) tuples, in ascending order of the value
+        factor = 2 / (self.gamma + 1)
+        result = [(-factor * self.gamma**i, self.negative[i]) for i in sorted(self.negative, reverse=True)]
+        if self.zero and not ex0:
+            result.append((0, self.zero))
+        result.extend((factor * self.gamma**i, self.positive[i]) for i in sorted(self.positive))
+        return result
+
+    def percentile(self, q, ex0, weighted):
+        buckets = self.buckets(ex0)
+        total = sum(weight for _, weight in buckets)
+        if not total:
+            return nan
+        cum = 0
+        if weighted:
+            target = q * total
+            for value, weight in buckets:
+                cum += weight
+                if cum >= target:
+                    return value
+        else:
+            target = q * (total - 1)  # rank of the (lower) value, like the non stats_only percentile
+            for value, weight in buckets:
+                cum += weight
+                if cum > target:
+                    return value
+        return buckets[-1][0]  # only in case of rounding errors
+
+    def bin_weight(self, lowerbound, upperbound, ex0=False):
+        return sum(weight for value, weight in self.buckets(ex0) if lowerbound < value <= upperbound)
+
+
+class _HistogramBins:
+    """
+    fixed histogram bins for stats_only monitors
+
+    Bin 0 collects the values <= lowerbound, bin i (1 <= i <= number_of_bins) the values in
+    (lowerbound + (i - 1) * bin_width, lowerbound + i * bin_width] and bin number_of_bins + 1 the values
+    above that, exactly like the classes of print_histogram.
+    Per bin, the weight (or duration) and the number of entries are counted, so querying a bin is O(number_of_bins),
+    provided its bounds are bin boundaries.
+    """
+
+    __slots__ = ("number_of_bins", "lowerbound", "bin_width", "upperbound", "weights", "counts", "zero_weight", "zero_count")
+
+    def __init__(self, number_of_bins, lowerbound, bin_width):
+        if number_of_bins < 1 or bin_width <= 0:
+            raise ValueError(f"histogram_bins ({number_of_bins}, {lowerbound}, {bin_width}) should have number_of_bins >= 1 and bin_width > 0")
+        self.number_of_bins = number_of_bins
+        self.lowerbound = lowerbound
+        self.bin_width = bin_width
+        self.upperbound = self.bound(number_of_bins)
+        self.weights = [0] * (number_of_bins + 2)
+        self.counts = [0] * (number_of_bins + 2)
+        self.zero_weight = 0
+        self.zero_count = 0
+
+    def bound(self, i):
+        # the (inclusive) upperbound of bin i
+        if i < 0:
+            return -inf
+        if i > self.number_of_bins:
+            return inf
+        return self.lowerbound + i * self.bin_width
+
+    def index(self, value):
+        if value <= self.lowerbound:
+            return 0
+        if value > self.upperbound:
+            return self.number_of_bins + 1
+        i = min(max(math.ceil((value - self.lowerbound) / self.bin_width), 1), self.number_of_bins)
+        # correct for rounding errors, so the bounds are exactly the ones of bound()
+        if value <= self.bound(i - 1):
+            return i - 1
+        if value > self.bound(i):
+            return i + 1
+        return i
+
+    def add(self, value, weight):
+        i = self.index(value)
+        self.weights[i] += weight
+        self.counts[i] += 1
+        if value == 0:
+            self.zero_weight += weight
+            self.zero_count += 1
+
+    def edge(self, bound):
+        # returns i if bound is the upperbound of bin i, None if it is not a bin boundary
+        if bound == -inf:
+            return -1
+        if bound == inf:
+            return self.number_of_bins + 1
+        i = round((bound - self.lowerbound) / self.bin_width)
+        if 0 <= i <= self.number_of_bins and math.isclose(self.bound(i), bound, rel_tol=1e-9, abs_tol=1e-9 * self.bin_width):
+            return i
+        return None
+
+    def bin(self, lowerbound, upperbound, ex0=False, entries=False):
+        # returns the weight (or number of entries) of the values in (lowerbound, upperbound], None if these are not bin boundaries
+        i_lowerbound = self.edge(lowerbound)
+        i_upperbound = self.edge(upperbound)
+        if i_lowerbound is None or i_upperbound is None:
+            return None
+        if i_upperbound <= i_lowerbound:
+            return 0
+        result = sum((self.counts if entries else self.weights)[i_lowerbound + 1 : i_upperbound + 1])
+        if ex0 and i_lowerbound < self.index(0) <= i_upperbound:
+            result -= self.zero_count if entries else self.zero_weight
+        return result
+
+
 class Monitor:
     """
     Monitor object
@@ -398,6 +542,20 @@ class Monitor:
 
         if False (default), full functionality
 
+    percentile_error : float
+        only for stats_only monitors: if given, the tallied values (with their weights or durations) are also
+        collected in a sketch, that makes percentile, median, the bin functions and print_histogram available,
+        with at most this relative error (e.g. 0.01 for 1%). The memory used does not depend on the number of tallies.
+
+        if omitted, these functions are not available for stats_only monitors
+
+    histogram_bins : tuple
+        only for stats_only monitors: if given, should be (number_of_bins, lowerbound, bin_width), like the
+        parameters of print_histogram. Then, the weight (or duration) and the number of entries are counted
+        per bin, so print_histogram and the bin functions are available (exact, as long as the bounds are
+        bin boundaries). The memory used does not depend on the number of tallies.
+
+        if omitted, no bins
 
     fill : list or tuple
         can be used to fill the tallied values (all at time now).
@@ -421,6 +579,8 @@ class Monitor:
         weight_legend: str = None,
         fill: Iterable = None,
         stats_only: bool = False,
+        percentile_error: float = None,
+        histogram_bins: Tuple = None,
         env: "Environment" = None,
         **kwargs,
     ):
@@ -459,6 +619,8 @@ class Monitor:
             raise ValueError("type '" + type + "' not recognized")
         self.xtype = type
         self._stats_only = stats_only
+        self._percentile_error = percentile_error
+        self._histogram_bins = histogram_bins
         self.isgenerated = False
         self.cached_xweight = {}
         self.reset(monitor)
@@ -1109,7 +1271,7 @@ class Monitor:
             return self._ttally
         raise TypeError("non level monitors are not supported")
 
-    def reset_monitors(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset_monitors(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None) -> None:
         """
         resets monitor
 
@@ -1129,13 +1291,18 @@ class Monitor:
 
             if omittted, no change of stats_only
 
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if omitted, no change of percentile_error
+
         Note
         ----
         Exactly same functionality as Monitor.reset()
         """
-        self.reset(monitor=monitor, stats_only=stats_only)
+        self.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
-    def reset(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None, histogram_bins: Tuple = None) -> None:
         """
         resets monitor
 
@@ -1153,6 +1320,20 @@ class Monitor:
             if False, full functionality
 
             if omittted, no change of stats_only
+
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if 0, these are not available anymore for stats_only monitors
+
+            if omitted, no change of percentile_error
+
+        histogram_bins : tuple
+            (number_of_bins, lowerbound, bin_width) of stats_only monitors (see Monitor)
+
+            if (), no more bins for stats_only monitors
+
+            if omitted, no change of histogram_bins
         """
         if self.isgenerated:
             raise TypeError("sliced, merged or frozen monitors cannot be reset")
@@ -1160,6 +1341,10 @@ class Monitor:
             self._monitor = monitor
         if stats_only is not None:
             self._stats_only = stats_only
+        if percentile_error is not None:
+            self._percentile_error = percentile_error
+        if histogram_bins is not None:
+            self._histogram_bins = histogram_bins
         self.start = self.env._now
         if self._stats_only:  # all values for ex0=False and ex0=True
             self.mun = [0] * 2
@@ -1171,6 +1356,8 @@ class Monitor:
             if self._level:
                 self._ttally_monitored = self.env._now
             self._weight = False
+            self._sketch = _QuantileSketch(self._percentile_error) if self._percentile_error else None
+            self._bins = _HistogramBins(*self._histogram_bins) if self._histogram_bins else None
 
         else:
             if self.xtypecode:
@@ -1178,6 +1365,7 @@ class Monitor:
             else:
                 self._x = []
             self._t = array.array("d")
+            self._x_version = 0  # incremented when the last tallied value is overwritten (see _xweight)
             self._weight = False
             if self._level:
                 self._weight = True  # signal for statistics that weights are present (although not stored in _weight)
@@ -1288,11 +1476,14 @@ class Monitor:
                     self.sn[ex0] = self.sn[ex0] + weight * (value_num - mun1) * (value_num - self.mun[ex0])
                     self._minimum[ex0] = min(self._minimum[ex0], value_num)
                     self._maximum[ex0] = max(self._maximum[ex0], value_num)
+                if self._sketch is not None:
+                    self._sketch.add(value_num, weight)
+                if self._bins is not None:
+                    self._bins.add(value_num, weight)
                 if weight != 1:
                     self._weight = True
 
         else:
-            self.cached_xweight.clear()  # invalidate cache
             if self._level:
                 if weight != 1:
                     if self._level:
@@ -1306,6 +1497,7 @@ class Monitor:
                     t = self.env._now
                     if self._t[-1] == t:
                         self._x[-1] = value
+                        self._x_version += 1
                     else:
                         self._x.append(value)
                         self._t.append(t)
@@ -1327,12 +1519,51 @@ class Monitor:
         self.tally(self._tally)
         self._ttally = save_ttally
 
+    def _tally_many(self, values: list) -> None:
+        # tallies all (numeric) values with weight 1 in one operation. Only for non level monitors.
+        # used for bulk queue operations
+        if self.isgenerated:
+            raise TypeError("sliced, merged or frozen monitors cannot be reset")
+        if not self._monitor or not values:
+            return
+        if self._stats_only:
+            for ex0 in (False, True):
+                xs = [value for value in values if value] if ex0 else values
+                if not xs:
+                    continue
+                n = len(xs)
+                mean = sum(xs) / n
+                sn = sum((x - mean) * (x - mean) for x in xs)
+                # combine with the statistics so far (Chan et al.)
+                sumw = self.sumw[ex0]
+                total = sumw + n
+                delta = mean - self.mun[ex0]
+                self.mun[ex0] += delta * n / total
+                self.sn[ex0] += sn + delta * delta * sumw * n / total
+                self.sumw[ex0] = total
+                self.n[ex0] += n
+                self._minimum[ex0] = min(self._minimum[ex0], min(xs))
+                self._maximum[ex0] = max(self._maximum[ex0], max(xs))
+            if self._sketch is not None:
+                for value in values:
+                    self._sketch.add(value, 1)
+            if self._bins is not None:
+                for value in values:
+                    self._bins.add(value, 1)
+        else:
+            n = len(values)
+            if self._weight:
+                self._weight.extend(itertools.repeat(1.0, n))
+            self._x.extend(values)
+            self._t.extend(itertools.repeat(self.env._now, n))
+
     def _tally_off(self):
         if self.isgenerated:
             raise TypeError("sliced, merged or frozen monitors cannot be reset")
         t = self.env._now
         if self._t[-1] == t:
             self._x[-1] = self.off
+            self._x_version += 1
         else:
             self._x.append(self.off)
             self._t.append(t)
@@ -1698,6 +1929,14 @@ class Monitor:
             else:
                 return nan
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                x, weight = xweight
+                sumweight = _numpy_sum(weight)
+                if sumweight:
+                    return _numpy_sum(x * weight) / sumweight
+                else:
+                    return nan
             x, weight = self._xweight(ex0=ex0)
             sumweight = sum(weight)
             if sumweight:
@@ -1731,6 +1970,16 @@ class Monitor:
             else:
                 return nan
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                x, weight = xweight
+                sumweight = _numpy_sum(weight)
+                if sumweight:
+                    wmean = self.mean(ex0=ex0)
+                    wvar = _numpy_sum(weight * (x - wmean) ** 2) / sumweight
+                    return math.sqrt(wvar)
+                else:
+                    return nan
             x, weight = self._xweight(ex0=ex0)
             sumweight = sum(weight)
             if sumweight:
@@ -1760,6 +2009,14 @@ class Monitor:
             else:
                 return nan
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                x = xweight[0]
+                if not len(x):
+                    return nan
+                if self.xtypecode:
+                    return x.min().item()
+                return self._xweight(ex0=ex0)[0][int(x.argmin())]  # the tallied value itself, like without numpy
             x = self._xweight(ex0=ex0)[0]
             if x:
                 return min(x)
@@ -1786,6 +2043,14 @@ class Monitor:
             else:
                 return nan
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                x = xweight[0]
+                if not len(x):
+                    return nan
+                if self.xtypecode:
+                    return x.max().item()
+                return self._xweight(ex0=ex0)[0][int(x.argmax())]  # the tallied value itself, like without numpy
             x = self._xweight(ex0=ex0)[0]
             if x:
                 return max(x)
@@ -1895,70 +2160,82 @@ class Monitor:
         -------
         q-th percentile : float
              0 returns the minimum, 50 the median and 100 the maximum
+
+        Note
+        ----
+        For stats_only monitors with a percentile_error, the percentile is estimated (within that relative error)
+        and interpolation is ignored.
         """
-        self._block_stats_only()
+        if self._stats_only and self._sketch is None:
+            self._block_stats_only()
 
         if interpolation not in (("linear", "lower", "higher", "midpoint") if self._weight else ("linear", "lower", "higher", "midpoint", "nearest")):
             raise ValueError("incorrect interpolation method " + str(interpolation))
 
+        if self._stats_only and self._level:
+            self._tally_add_now()
         q = max(0, min(q, 100))
         if q == 0:
             return self.minimum(ex0=ex0)
         if q == 100:
             return self.maximum(ex0=ex0)
         q /= 100
-        x, weight = self._xweight(ex0=ex0)
+        if self._stats_only:
+            ex0 = bool(ex0)
+            value = self._sketch.percentile(q, ex0=ex0, weighted=self._weight)
+            return min(max(value, self._minimum[ex0]), self._maximum[ex0])  # the extremes are exact
+        x_sorted, weight_sorted, weight_cum, sum_weight, order = self._sorted_xweight(ex0=ex0)
+
+        def x_sorted_value(k):
+            if isinstance(x_sorted, list):
+                return x_sorted[k]
+            if order is None:
+                return x_sorted[k].item()  # numpy scalars might overflow in the calculations below
+            # for any monitors, return the tallied value itself (e.g. an int, whereas the numpy array is float), like without numpy
+            return self._xweight(ex0=ex0)[0][order[k]]
 
-        if len(x) == 1:
-            return x[0]
+        if len(x_sorted) == 1:
+            return x_sorted_value(0)
 
-        sum_weight = sum(weight)
         if not sum_weight:
             return nan
 
-        x_sorted, weight_sorted = zip(*sorted(zip(x, weight), key=lambda v: v[0]))
         n = len(x_sorted)
 
         if self._weight:
-            weight_cum = []
-            cum = 0
-            for k in range(n):
-                cum += weight_sorted[k]
-                weight_cum.append(cum / sum_weight)
-            for k in range(n):
-                if weight_cum[k] >= q:
-                    break
+            k = int(searchsorted(weight_cum, q, "left"))  # the first k for which weight_cum[k] >= q
             if weight_cum[k] != q:
-                return x_sorted[k]
+                return x_sorted_value(k)
 
             if interpolation in ("linear", "midpoint"):
-                return (x_sorted[k] + x_sorted[k + 1]) / 2
+                return (x_sorted_value(k) + x_sorted_value(k + 1)) / 2
             if interpolation in ("lower"):
-                return x_sorted[k]
+                return x_sorted_value(k)
             if interpolation == "higher":
-                return x_sorted[k + 1]
+                return x_sorted_value(k + 1)
 
         else:
-            weight_cum = []
-            for k in range(n):
-                weight_cum.append(k / (n - 1))
-            for k in range(n):
-                if weight_cum[k + 1] > q:
-                    break
+            # the first k for which (k + 1) / (n - 1) > q
+            k = min(int(q * (n - 1)), n - 2)
+            while k > 0 and k / (n - 1) > q:
+                k -= 1
+            while (k + 1) / (n - 1) <= q:
+                k += 1
+            x_k, x_k1 = x_sorted_value(k), x_sorted_value(k + 1)
 
             if interpolation == "linear":
-                return interpolate(q, weight_cum[k], weight_cum[k + 1], x_sorted[k], x_sorted[k + 1])
+                return interpolate(q, k / (n - 1), (k + 1) / (n - 1), x_k, x_k1)
             if interpolation == "lower":
-                return x_sorted[k]
+                return x_k
             if interpolation == "higher":
-                return x_sorted[k + 1]
+                return x_k1
             if interpolation == "midpoint":
-                return (x_sorted[k] + x_sorted[k + 1]) / 2
+                return (x_k + x_k1) / 2
             if interpolation == "nearest":
-                if q - weight_cum[k] <= weight_cum[k + 1] - q:
-                    return x_sorted[k]
+                if q - k / (n - 1) <= (k + 1) / (n - 1) - q:
+                    return x_k
                 else:
-                    return x_sorted[k + 1]
+                    return x_k1
 
     def bin_number_of_entries(self, lowerbound: float, upperbound: float, ex0: bool = False) -> int:
         """
@@ -1982,12 +2259,18 @@ class Monitor:
         Note
         ----
         Not available for level monitors
+
+        For stats_only monitors with histogram_bins, the number is exact if the bounds are bin boundaries.
+        Otherwise, for stats_only monitors with a percentile_error, the number is estimated, provided no weights are used
         """
-        self._block_stats_only()
+        if self._stats_only and self._sketch is None and self._bins is None:
+            self._block_stats_only()
         if self._level:
             raise TypeError("bin_number_of_entries not available for level monitors")
-        x = self._xweight(ex0=ex0)[0]
-        return sum(1 for vx in x if (vx > lowerbound) and (vx <= upperbound))
+        if self._stats_only:
+            return self._stats_only_bin(lowerbound, upperbound, ex0=ex0, entries=True)
+        x_sorted = self._sorted_xweight(ex0=ex0)[0]
+        return max(0, int(searchsorted(x_sorted, upperbound, "right") - searchsorted(x_sorted, lowerbound, "right")))
 
     def bin_weight(self, lowerbound: float, upperbound: float) -> float:
         """
@@ -2008,8 +2291,12 @@ class Monitor:
         Note
         ----
         Not available for level monitors
+
+        For stats_only monitors with histogram_bins, the weight is exact if the bounds are bin boundaries.
+        Otherwise, for stats_only monitors with a percentile_error, the weight is estimated
         """
-        self._block_stats_only()
+        if self._stats_only and self._sketch is None and self._bins is None:
+            self._block_stats_only()
         if self._level:
             raise TypeError("bin_weight not available for level monitors")
         return self.sys_bin_weight(lowerbound, upperbound)
@@ -2032,16 +2319,46 @@ class Monitor:
 
         Note
         ----
-        Not available for level monitors
+        Not available for non level monitors
+
+        For stats_only monitors with histogram_bins, the duration is exact if the bounds are bin boundaries.
+        Otherwise, for stats_only monitors with a percentile_error, the duration is estimated
         """
-        self._block_stats_only()
+        if self._stats_only and self._sketch is None and self._bins is None:
+            self._block_stats_only()
         if not self._level:
             raise TypeError("bin_duration not available for non level monitors")
         return self.sys_bin_weight(lowerbound, upperbound)
 
     def sys_bin_weight(self, lowerbound, upperbound):
-        x, weight = self._xweight()
-        return sum((vweight for vx, vweight in zip(x, weight) if (vx > lowerbound) and (vx <= upperbound)))
+        if self._stats_only:
+            return self._stats_only_bin(lowerbound, upperbound)
+        x_sorted, weight_sorted, _, _, _ = self._sorted_xweight()
+        lower_index = int(searchsorted(x_sorted, lowerbound, "right"))
+        upper_index = int(searchsorted(x_sorted, upperbound, "right"))
+        if lower_index >= upper_index:
+            return 0
+        if weight_sorted is None:  # all weights are 1
+            return float(upper_index - lower_index)
+        if isinstance(weight_sorted, list):
+            return sum(weight_sorted[lower_index:upper_index])
+        return _numpy_sum(weight_sorted[lower_index:upper_index])
+
+    def _stats_only_bin(self, lowerbound, upperbound, ex0=False, entries=False):
+        # weight (or number of entries) of the values in (lowerbound, upperbound] of a stats_only monitor,
+        # from the histogram bins if possible, otherwise estimated with the sketch
+        if self._level:
+            self._tally_add_now()
+        if self._bins is not None:
+            result = self._bins.bin(lowerbound, upperbound, ex0=ex0, entries=entries)
+            if result is not None:
+                return result
+        if self._sketch is None or (entries and self._weight):
+            raise NotImplementedError(
+                f"bin ({lowerbound}, {upperbound}] not available for {self.name()} because it is stats_only"
+                + ("" if self._bins is None else " and the bounds are not boundaries of its histogram_bins")
+            )
+        return self._sketch.bin_weight(lowerbound, upperbound, ex0=ex0)
 
     def value_number_of_entries(self, value: Any) -> int:
         """
@@ -2073,6 +2390,10 @@ class Monitor:
         except TypeError:
             values = [value]
 
+        xweight = self._numpy_value_xweight(values)
+        if xweight is not None:
+            x = xweight[0]
+            return int(numpy.count_nonzero(numpy.isin(x, list(values))))
         x = self._xweight(force_numeric=False)[0]
         return sum(1 for vx in x if (vx in values))
 
@@ -2125,8 +2446,6 @@ class Monitor:
         return self.sys_value_weight(value)
 
     def sys_value_weight(self, value):
-        x, weight = self._xweight(force_numeric=False)
-
         if isinstance(value, str):
             value = [value]
         try:
@@ -2135,8 +2454,20 @@ class Monitor:
         except TypeError:
             values = [value]
 
+        xweight = self._numpy_value_xweight(values)
+        if xweight is not None:
+            x, weight = xweight
+            return _numpy_sum(weight[numpy.isin(x, list(values))])
+        x, weight = self._xweight(force_numeric=False)
         return sum(vweight for (vx, vweight) in zip(x, weight) if vx in values)
 
+    def _numpy_value_xweight(self, values):
+        # the (not forced numeric) x-values and weights as numpy arrays, if the values can be checked vectorized.
+        # Otherwise (no numpy, non numeric tallied values or values to check), None.
+        if not all(isinstance(v, numbers.Real) for v in values):
+            return None
+        return self._numpy_xweight(force_numeric=False)
+
     def number_of_entries(self, ex0: bool = False) -> int:
         """
         count of the number of entries
@@ -2160,6 +2491,9 @@ class Monitor:
             ex0 = bool(ex0)
             return self.n[ex0]
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                return len(xweight[0])
             x = self._xweight(ex0=ex0)[0]
             return len(x)
 
@@ -2226,6 +2560,9 @@ class Monitor:
             ex0 = bool(ex0)
             return self.sumw[ex0]
         else:
+            xweight = self._numpy_xweight(ex0=ex0)
+            if xweight is not None:
+                return _numpy_sum(xweight[1])
             _, weight = self._xweight(ex0=ex0)
             return sum(weight)
 
@@ -2320,7 +2657,7 @@ class Monitor:
         result.append(f"{indent}std.deviation {fn(self.std(), 13, 3)}{fn(self.std(ex0=True), 13, 3)}")
         result.append("")
         result.append(f"{indent}minimum       {fn(self.minimum(), 13, 3)}{fn(self.minimum(ex0=True), 13, 3)}")
-        if not self._stats_only:
+        if not self._stats_only or self._sketch is not None:
             result.append(f"{indent}median        {fn(self.percentile(50), 13, 3)}{fn(self.percentile(50, ex0=True), 13, 3)}")
             result.append(f"{indent}90% percentile{fn(self.percentile(90), 13, 3)}{fn(self.percentile(90, ex0=True), 13, 3)}")
             result.append(f"{indent}95% percentile{fn(self.percentile(95), 13, 3)}{fn(self.percentile(95, ex0=True), 13, 3)}")
@@ -2341,8 +2678,16 @@ class Monitor:
         Returns
         -------
         bin_width, lowerbound, number_of_bins : tuple
+
+        Note
+        ----
+        For stats_only monitors with histogram_bins, these bins are returned
         """
-        self._block_stats_only()
+        if self._stats_only:
+            if self._bins is not None:
+                return self._bins.bin_width, self._bins.lowerbound, self._bins.number_of_bins
+            if self._sketch is None:
+                self._block_stats_only()
 
         if self.sys_weight(ex0=ex0) == 0:
             return 1, 0, 0
@@ -2536,6 +2881,10 @@ class Monitor:
             graph_scale = 80
 
         if self._stats_only:
+            if values is not False:
+                self._block_stats_only()
+            if self._level:
+                self._tally_add_now()
             weight_total = self.sumw[bool(ex0)]
         else:
             x, weight = self._xweight(ex0=ex0, force_numeric=not values)
@@ -2635,7 +2984,7 @@ class Monitor:
             if auto_scale:
                 bin_width, lowerbound, number_of_bins = self.histogram_autoscale()
             result.append(self.print_statistics(show_header=False, show_legend=True, do_indent=False, as_str=True))
-            if not self._stats_only and number_of_bins >= 0:
+            if (not self._stats_only or self._sketch is not None or self._bins is not None) and number_of_bins >= 0:
                 result.append("")
                 if self._weight:
                     result.append("           <= " + rpad(self.weight_legend, 13) + "     %  cum%")
@@ -2726,10 +3075,13 @@ class Monitor:
             except (ValueError, TypeError):
                 return (weight, math.inf, str(x).lower())
 
-        x_unique = []  # not possible to use set() as items do not have to be hashable
-        for item in x:
-            if item not in x_unique:
-                x_unique.append(item)
+        if self.xtypecode and has_numpy():
+            x_unique = numpy.unique(_numpy_frombuffer(x, dtype=self.xtypecode)).tolist()
+        else:
+            x_unique = []  # not possible to use set() as items do not have to be hashable
+            for item in x:
+                if item not in x_unique:
+                    x_unique.append(item)
 
         return list(sorted(x_unique, key=key))
 
@@ -3115,12 +3467,41 @@ class Monitor:
 
         return tuple(reversed(self.xt(ex0=ex0, exoff=exoff, force_numeric=force_numeric, add_now=add_now)))
 
-    def _xweight(self, ex0=False, force_numeric=True):
+    def _xweight_version(self):
         t_extra = self.env._t if self.env._animate else self.env._now
+        # tallying only appends values or overwrites the last value (with _x_version incremented),
+        # so the cache is still valid if these and t_extra are unchanged. That's why tally doesn't have to invalidate the cache.
+        return (t_extra, len(self._x), self._x_version)
 
-        if (ex0, force_numeric) in self.cached_xweight:
-            if self.cached_xweight[(ex0, force_numeric)][0] == t_extra:
-                return self.cached_xweight[(ex0, force_numeric)][1]
+    def _xweight(self, ex0=False, force_numeric=True):
+        version = self._xweight_version()
+        t_extra = version[0]
+
+        cached = self.cached_xweight.get((ex0, force_numeric))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        x_numpy = self._numpy_x(force_numeric=False) if has_numpy() else None
+        if x_numpy is not None:
+            # vectorized, as all values are numeric (always the case for typed monitors)
+            if self.xtypecode or (not force_numeric):
+                x = self._x
+            else:
+                x = list(self._x)  # forcing numeric wouldn't change anything
+            weight, keep = self._numpy_weight_keep(x_numpy, ex0=ex0)
+            if keep is not None:
+                if self.xtypecode:
+                    x = array.array(self.xtypecode, x_numpy[keep].tobytes())
+                else:
+                    x = list(itertools.compress(x, keep.tolist()))
+                weight = weight[keep]
+            if self._level or self._weight is False or keep is not None:
+                weight = array.array("d", weight.tobytes())
+            else:
+                weight = self._weight
+            xweight = (x, weight)
+            self.cached_xweight[(ex0, force_numeric)] = (version, xweight)
+            return xweight
 
         if self.xtypecode or (not force_numeric):
             x = self._x
@@ -3167,9 +3548,132 @@ class Monitor:
                 else:
                     xweight = (x, array.array("d", (1,) * len(x)))
 
-        self.cached_xweight[(ex0, force_numeric)] = (t_extra, xweight)
+        self.cached_xweight[(ex0, force_numeric)] = (version, xweight)
         return xweight
 
+    def _sorted_xweight(self, ex0=False, force_numeric=True):
+        # the x-values sorted, the weights in the same order, the cumulated weights divided by the total weight,
+        # the total weight and the order. The weights and cumulated weights are None for non weighted, non level monitors.
+        # These are numpy arrays if possible, otherwise lists.
+        # The order (the index of each sorted x-value in _xweight) is only given for any monitors with numpy, where the
+        # sorted x-values are converted, so the tallied values can be found directly. Otherwise, it is None.
+        # The result is built lazily and cached like _xweight, so repeated percentile and bin queries on the same
+        # data just do a binary search.
+        version = self._xweight_version()
+
+        cached = self.cached_xweight.get(("sorted", ex0, force_numeric))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        xweight = self._numpy_xweight(ex0=ex0, force_numeric=force_numeric)
+        if xweight is not None:
+            x, weight = xweight  # sorting (or indexing with order) makes copies, so the result can be kept
+            sum_weight = _numpy_sum(weight)
+            if self._weight or not self.xtypecode:
+                # stable, to cumulate the weights like without numpy and to find equal tallied values in order of tallying
+                order = numpy.argsort(x, kind="stable")
+                x_sorted = x[order]
+            else:
+                order = None
+                x_sorted = numpy.sort(x)
+            if self._weight:
+                weight_sorted = weight[order]
+                weight_cum = (numpy.cumsum(weight_sorted) / sum_weight) if sum_weight else None
+            else:
+                weight_sorted = weight_cum = None
+            if self.xtypecode:
+                order = None
+        else:
+            x, weight = self._xweight(ex0=ex0, force_numeric=force_numeric)
+            sum_weight = sum(weight)
+            if self._weight:
+                x_sorted = []
+                weight_sorted = []
+                for vx, vweight in sorted(zip(x, weight), key=lambda v: v[0]):
+                    x_sorted.append(vx)
+                    weight_sorted.append(vweight)
+                weight_cum = None
+                if sum_weight:
+                    weight_cum = []
+                    cum = 0
+                    for vweight in weight_sorted:
+                        cum += vweight
+                        weight_cum.append(cum / sum_weight)
+            else:
+                x_sorted = sorted(x)
+                weight_sorted = weight_cum = None
+            order = None
+
+        sorted_xweight = (x_sorted, weight_sorted, weight_cum, sum_weight, order)
+        self.cached_xweight[("sorted", ex0, force_numeric)] = (version, sorted_xweight)
+        return sorted_xweight
+
+    def _numpy_x(self, force_numeric=True):
+        # the x-values as a numeric numpy array, or None if that's not possible (then the pure Python code has to be used)
+        # For typed monitors, this is a zero-copy view on the array.array buffer (see _numpy_frombuffer). As an
+        # array.array can't grow as long as such a view exists, the result (and anything derived from it without copying) should never be kept.
+        if self.xtypecode:
+            return _numpy_frombuffer(self._x, dtype=self.xtypecode)
+        version = (len(self._x), self._x_version)
+        cached = self.cached_xweight.get(("numpy", False))
+        if cached is None or cached[0] != version:
+            try:
+                x = numpy.array(self._x)
+            except (ValueError, TypeError):  # e.g. tuples of different lengths
+                x = None
+            if x is not None and (x.ndim != 1 or x.dtype.kind not in "biuf"):
+                x = None
+            cached = (version, x)
+            self.cached_xweight[("numpy", False)] = cached  # for any monitors, x is a copy, so can be kept
+        if cached[1] is not None or not force_numeric:
+            return cached[1]  # if all values are numeric, forcing numeric doesn't change anything
+
+        cached = self.cached_xweight.get(("numpy", True))
+        if cached is None or cached[0] != version:
+            x = numpy.array(do_force_numeric(self._x))
+            if x.dtype.kind == "O":  # e.g. Fraction, Decimal or very large ints
+                try:
+                    x = x.astype(float)
+                except (ValueError, TypeError, OverflowError):
+                    x = None
+            elif x.dtype.kind not in "biuf":  # e.g. complex
+                x = None
+            cached = (version, x)
+            self.cached_xweight[("numpy", True)] = cached
+        return cached[1]
+
+    def _numpy_weight_keep(self, x, ex0=False):
+        # the weights of all x-values (numpy array) and the boolean mask of the values to be used (None if all)
+        if self._level:
+            t_extra = self.env._t if self.env._animate else self.env._now
+            weight = numpy.diff(_numpy_frombuffer(self._t, dtype="d"), append=t_extra)
+            keep = x != self.off
+            if ex0:
+                keep &= x != 0
+        else:
+            if self._weight:
+                weight = _numpy_frombuffer(self._weight, dtype="d")
+            else:
+                weight = numpy.broadcast_to(1.0, len(x))  # read only, without allocating memory
+            keep = (x != 0) if ex0 else None
+        return weight, keep
+
+    def _numpy_xweight(self, ex0=False, force_numeric=True):
+        # vectorized equivalent of _xweight, returning numpy arrays (never to be kept, see _numpy_x)
+        # returns None if numpy is not available or the x-values can't be made numeric
+        if not has_numpy():
+            return None
+        x = self._numpy_x(force_numeric=force_numeric)
+        if x is None:
+            return None
+        weight, keep = self._numpy_weight_keep(x, ex0=ex0)
+        if keep is None:
+            return x, weight
+        x = x[keep]
+        if self._weight is False:
+            return x, numpy.broadcast_to(1.0, len(x))
+        return x, weight[keep]
+
     def as_dataframe(
         self, include_t: bool = True, use_datetime0=False, ex0: bool = False, exoff=False, force_numeric: bool = True, add_now: bool = True
     ) -> "dataframe":
@@ -3372,6 +3876,63 @@ class _StatusMonitor(Monitor):
         raise ValueError("not possible to use status.value")
 
 
+class _ComponentValue:
+    """
+    stand in for the status or mode monitor of a component, that just holds the current value
+
+    Used when the environment is created with component_monitors=False.
+    """
+
+    __slots__ = ("parent", "_value")
+
+    def __init__(self, parent, value):
+        self.parent = parent
+        self._value = value
+
+    def __call__(self, t=None):
+        if t is None:
+            return self._value
+        raise NotImplementedError("__call__(t) not supported if component_monitors is False")
+
+    def get(self, t: float = None) -> Any:
+        return self.__call__(t)
+
+    def tally(self, value: Any) -> None:
+        self._value = value
+
+    def reset(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None, histogram_bins: Tuple = None) -> None: ...
+
+    def monitor(self, value: bool = None) -> bool:
+        return False
+
+    def __getattr__(self, attr):
+        raise AttributeError(f"'{attr}' not available, because the environment has component_monitors=False")
+
+
+class _StatusValue(_ComponentValue):
+    __slots__ = ()
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        raise ValueError("not possible to use status.value")
+
+
+class _ModeValue(_ComponentValue):
+    __slots__ = ()
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        self.parent.set_mode(value)
+
+
 class _StateMonitor(Monitor):
     def __init__(self, parent, *args, **kwargs):
         self.parent = parent
@@ -3393,6 +3954,11 @@ class _StateMonitor(Monitor):
     def value(self, value: Any) -> None:
         self.parent.set(value)
 
+    def __call__(self, t=None):
+        if t is None and self.env._state_reads is not None:
+            self.env._state_reads[self.parent] = None
+        return super().__call__(t)
+
 
 class _SystemMonitor(Monitor):
     @property
@@ -3795,7 +4361,7 @@ class AnimateMonitor(DynamicClass):
         if parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
         self.env = monitor.env
         self.ao_frame_fill = AnimateRectangle(
             spec=lambda: (0, 0, self.width_t, self.height_t),
@@ -4214,9 +4780,11 @@ if Pythonista:
             g.in_draw = False
 
 
+_empty_mapping = types.MappingProxyType({})
+
+
 class Qmember:
-    def __init__(self):
-        pass
+    __slots__ = ("predecessor", "successor", "priority", "component", "queue", "enter_time", "block")
 
     def insert_in_front_of(self, m2, c, q, priority):
         available_quantity = q.capacity._tally - q._length - 1
@@ -4234,9 +4802,12 @@ class Qmember:
         self.queue = q
         self.enter_time = c.env._now
         q._length += 1
+        if q._priorities:
+            q._priorities.add(self)
+        if q._positions is not None:
+            q._positions.add(self)
         if not (isinstance(q, Store) or q._isinternal):  # this is because internal and as store never need touch handling (new in 23.0.1)
-            for iter in q._iter_touched:
-                q._iter_touched[iter] = True
+            q._version += 1
         c._qmembers[q] = self
         if q.env._trace:
             if not q._isinternal:
@@ -4245,20 +4816,203 @@ class Qmember:
         q.number_of_arrivals += 1
         if isinstance(q, Store):
             store = q
-            for requester in store._from_store_requesters:
-                if requester._from_store_filter(c):
-                    c.leave(store)
-                    for store0 in requester._from_stores:
-                        requester.leave(store0._from_store_requesters)
-                    requester._from_stores = []
-                    requester._from_store_item = c
-                    requester._from_store_store = store
-                    requester._remove()
-                    requester.status._value = scheduled
-                    requester._reschedule(
-                        requester.env._now, 0, False, f"from_store ({store.name()}) honor with {c.name()}", False, s0=requester.env.last_s0, return_value=c
-                    )
-                    break
+            if store._key is not None:
+                store._add_item_key(c)
+            requester = store._from_store_requester_for(c)
+            if requester is not None:
+                c.leave(store)
+                store._honor_from_store(requester, c)
+
+
+class _QueuePriorities:
+    """
+    index on the priorities of a queue
+
+    As the members of a (sorted) queue with the same priority form a contiguous run,
+    it is sufficient to maintain a sorted list of the distinct priorities, together with the
+    last qmember and the number of qmembers of each run.
+    That makes finding the place to enter with a given priority O(log k), with k the number of distinct priorities,
+    instead of a linear walk through the queue.
+
+    If the queue turns out not to be sorted (which is possible with insert, copy, union, etc.), the index is
+    dropped and q._priorities is set to False, meaning that the linear search will be used until the queue is empty.
+    """
+
+    __slots__ = ("queue", "priorities", "last", "count")
+
+    def __init__(self, q):
+        self.queue = q
+        self.priorities = []
+        self.last = {}
+        self.count = {}
+        q._priorities = self
+        mx = q._head.successor
+        while mx is not q._tail and q._priorities:
+            self.add(mx)
+            mx = mx.successor
+
+    def add(self, mx):
+        priority = mx.priority
+        q = self.queue
+        if (mx.predecessor is not q._head and priority < mx.predecessor.priority) or (
+            mx.successor is not q._tail and priority > mx.successor.priority
+        ):
+            q._priorities = False
+            return
+        if priority in self.count:
+            self.count[priority] += 1
+            if self.last[priority] is mx.predecessor:
+                self.last[priority] = mx
+        else:
+            bisect.insort(self.priorities, priority)
+            self.count[priority] = 1
+            self.last[priority] = mx
+
+    def remove(self, mx):
+        priority = mx.priority
+        count = self.count[priority] - 1
+        if count:
+            self.count[priority] = count
+            if self.last[priority] is mx:
+                self.last[priority] = mx.predecessor
+        else:
+            del self.count[priority]
+            del self.last[priority]
+            del self.priorities[bisect.bisect_left(self.priorities, priority)]
+
+    def insertion_point(self, priority):
+        """
+        returns the qmember in front of which a component with the given priority should be entered
+        (i.e. the first qmember with a priority > the given priority)
+        """
+        i = bisect.bisect_right(self.priorities, priority)
+        if i == 0:
+            return self.queue._head.successor
+        return self.last[self.priorities[i - 1]].successor
+
+
+class _QueuePositions:
+    """
+    order statistics of a queue
+
+    The qmembers of the queue are (also) kept in a list of blocks (lists) of limited size, with a Fenwick tree
+    over the lengths of the blocks. Each qmember knows its block.
+    That makes getting the qmember at a given index and the index of a given qmember
+    O(log b + block size), with b the number of blocks, instead of a linear walk through the queue.
+
+    The structure is built on the first positional query on a queue with at least minimum_length components
+    and maintained from then on, until the queue gets empty.
+    """
+
+    __slots__ = ("queue", "blocks", "tree", "block_number")
+
+    block_size = 256
+    minimum_length = 64
+
+    def __init__(self, q):
+        self.queue = q
+        self.blocks = []
+        block = []
+        mx = q._head.successor
+        while mx is not q._tail:
+            if len(block) == self.block_size:
+                self.blocks.append(block)
+                block = []
+            block.append(mx)
+            mx.block = block
+            mx = mx.successor
+        if block:
+            self.blocks.append(block)
+        self._build()
+        q._positions = self
+
+    def _build(self):
+        blocks = self.blocks
+        number_of_blocks = len(blocks)
+        tree = [0] * (number_of_blocks + 1)
+        for i, block in enumerate(blocks, 1):
+            tree[i] += len(block)
+            j = i + (i & -i)
+            if j <= number_of_blocks:
+                tree[j] += tree[i]
+        self.tree = tree
+        self.block_number = {id(block): i for i, block in enumerate(blocks)}
+
+    def _update(self, i, delta):
+        tree = self.tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def add(self, mx):
+        # should be called after mx is linked in
+        m2 = mx.successor
+        blocks = self.blocks
+        if m2 is self.queue._tail:
+            if not blocks:
+                blocks.append([])
+                self._build()
+            block = blocks[-1]
+            block.append(mx)
+        else:
+            block = m2.block
+            block.insert(block.index(m2), mx)
+        mx.block = block
+        i = self.block_number[id(block)]
+        if len(block) > 2 * self.block_size:
+            new_block = block[self.block_size :]
+            del block[self.block_size :]
+            for m in new_block:
+                m.block = new_block
+            blocks.insert(i + 1, new_block)
+            self._build()
+        else:
+            self._update(i, 1)
+
+    def extend(self, members):
+        # should be called after members are linked in at the tail (in that order)
+        blocks = self.blocks
+        block = blocks[-1] if blocks else None
+        for mx in members:
+            if block is None or len(block) >= self.block_size:
+                block = []
+                blocks.append(block)
+            block.append(mx)
+            mx.block = block
+        self._build()
+
+    def remove(self, mx):
+        block = mx.block
+        i = self.block_number[id(block)]
+        block.remove(mx)
+        if block:
+            self._update(i, -1)
+        else:
+            del self.blocks[i]
+            self._build()
+
+    def index(self, mx):
+        block = mx.block
+        i = self.block_number[id(block)]
+        tree = self.tree
+        result = block.index(mx)
+        while i:
+            result += tree[i]
+            i &= i - 1
+        return result
+
+    def qmember(self, index):
+        # index should be 0 <= index < len(queue)
+        tree = self.tree
+        i = 0
+        step = 1 << ((len(tree) - 1).bit_length() - 1)
+        while step:
+            if i + step < len(tree) and tree[i + step] <= index:
+                i += step
+                index -= tree[i]
+            step >>= 1
+        return self.blocks[i][index]
 
 
 class Queue:
@@ -4291,6 +5045,19 @@ class Queue:
 
         default: inf
 
+    capacity_schedule : iterable of (time, capacity) tuples
+        if given, the capacity will be set to capacity at the given time (so without the need for a component).
+        The times should be ascending. Changes at or before now are applied immediately
+        (overriding capacity).
+
+        if omitted, the capacity is only changed with set_capacity
+
+    capacity_schedule_cycle : float
+        if given, capacity_schedule is repeated every capacity_schedule_cycle time units,
+        e.g. 7 * 24 for a weekly roster in hours. Should be greater than the time span of capacity_schedule.
+
+        if omitted, capacity_schedule is applied just once
+
     monitor : bool
         if True (default) , both length and length_of_stay are monitored
 
@@ -4302,9 +5069,24 @@ class Queue:
         if omitted, default_env will be used
     """
 
-    def __init__(self, name: str = None, monitor: Any = True, fill: Iterable = None, capacity: float = inf, env: "Environment" = None, **kwargs) -> None:
+    def __init__(
+        self,
+        name: str = None,
+        monitor: Any = True,
+        fill: Iterable = None,
+        capacity: float = inf,
+        env: "Environment" = None,
+        capacity_schedule: Iterable = None,
+        capacity_schedule_cycle: float = None,
+        **kwargs,
+    ) -> None:
         self.env = _set_env(env)
         _check_overlapping_parameters(self, "__init__", "setup")
+        if capacity_schedule is None:
+            self._capacity_schedule = None
+        else:
+            self._capacity_schedule = _CapacitySchedule(self, capacity_schedule, capacity_schedule_cycle)
+            capacity = self._capacity_schedule.current_capacity(capacity)
 
         _set_name(name, self.env._nameserializeQueue, self)
         self._head = Qmember()
@@ -4318,9 +5100,11 @@ class Queue:
         self._head.priority = 0
         self._tail.priority = 0
         self._length = 0
-        self._iter_sequence = 0
-        self._iter_touched = {}
+        self._priorities = None
+        self._positions = None
+        self._version = 0  # incremented on every enter and priority change, to signal iterators
         self._isinternal = False
+        self._owner = None  # resource or state that keeps the members indexed by priority (see Component.priority)
         self.arrival_rate(reset=True)
         self.departure_rate(reset=True)
         self.length = _SystemMonitor("Length of " + self.name(), level=True, initial_tally=0, monitor=monitor, type="uint32", env=self.env)
@@ -4337,6 +5121,8 @@ class Queue:
                     c.enter(self)
         if self.env._trace:
             self.env.print_trace("", "", self.name() + " create")
+        if self._capacity_schedule is not None:
+            self._capacity_schedule.schedule_next()
         self.setup(**kwargs)
 
     def setup(self, **kwargs: Any) -> None:
@@ -4528,7 +5314,7 @@ class Queue:
         """
         return (self.length, self.length_of_stay)
 
-    def reset_monitors(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset_monitors(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None) -> None:
         """
         resets queue monitor length_of_stay and length
 
@@ -4548,12 +5334,17 @@ class Queue:
 
             if omittted, no change of stats_only
 
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if omitted, no change of percentile_error
+
         Note
         ----
         it is possible to reset individual monitoring with length_of_stay.reset() and length.reset()
         """
-        self.length.reset(monitor=monitor, stats_only=stats_only)
-        self.length_of_stay.reset(monitor=monitor, stats_only=stats_only)
+        self.length.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
+        self.length_of_stay.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
     def arrival_rate(self, reset: bool = False) -> float:
         """
@@ -4791,6 +5582,25 @@ class Queue:
         self.capacity.tally(cap)
         self.available_quantity.tally(cap - self._length)
 
+    def set_capacity_schedule(self, capacity_schedule: Iterable = None, cycle: float = None) -> None:
+        """
+        sets or cancels the capacity schedule
+
+        Parameters
+        ----------
+        capacity_schedule : iterable of (time, capacity) tuples
+            the capacity will be set to capacity at the given time. The times should be ascending.
+            Changes at or before now are applied immediately.
+
+            if omitted, the current capacity schedule (if any) is cancelled
+
+        cycle : float
+            if given, capacity_schedule is repeated every cycle time units
+
+            if omitted, capacity_schedule is applied just once
+        """
+        _CapacitySchedule.replace(self, capacity_schedule, cycle)
+
     def name(self, value: str = None) -> str:
         """
         Parameters
@@ -4982,13 +5792,10 @@ class Queue:
         if index > self._length:
             raise IndexError("index > lengh of queue")
         component._checknotinqueue(self)
-        mx = self._head.successor
-        count = 0
-        while mx != self._tail:
-            if count == index:
-                break
-            count = count + 1
-            mx = mx.successor
+        if index == self._length:
+            mx = self._tail
+        else:
+            mx = self._qmember(index)
         priority = mx.priority
         Qmember().insert_in_front_of(mx, component, self, priority)
         return self
@@ -5147,53 +5954,50 @@ class Queue:
     def __contains__(self, component: "Component") -> bool:
         return component._member(self) is not None
 
+    def _qmember(self, index: int) -> "Qmember":
+        # returns the qmember at index (0 <= index < len(self))
+        if self._positions is None and self._length >= _QueuePositions.minimum_length:
+            _QueuePositions(self)
+        if self._positions is not None:
+            return self._positions.qmember(index)
+        if index < self._length // 2:
+            mx = self._head.successor
+            for _ in range(index):
+                mx = mx.successor
+        else:
+            mx = self._tail.predecessor
+            for _ in range(self._length - 1 - index):
+                mx = mx.predecessor
+        return mx
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             # Get the start, stop, and step from the slice
-            startval, endval, incval = key.indices(self._length)
-            if incval > 0:
+            indexes = range(*key.indices(self._length))
+            if not indexes:
+                return []
+            if indexes.step == 1:
                 result = []
-                targetval = startval
-                mx = self._head.successor
-                count = 0
-                while mx != self._tail:
-                    if targetval >= endval:
-                        break
-                    if targetval == count:
-                        result.append(mx.component)
-                        targetval += incval
-                    count += 1
+                mx = self._qmember(indexes.start)
+                for _ in indexes:
+                    result.append(mx.component)
                     mx = mx.successor
-            else:
+                return result
+            if indexes.step == -1:
                 result = []
-                targetval = startval
-                mx = self._tail.predecessor
-                count = self._length - 1
-                while mx != self._head:
-                    if targetval <= endval:
-                        break
-                    if targetval == count:
-                        result.append(mx.component)
-                        targetval += incval  # incval is negative here!
-                    count -= 1
+                mx = self._qmember(indexes.start)
+                for _ in indexes:
+                    result.append(mx.component)
                     mx = mx.predecessor
-
-            return list(result)
+                return result
+            return [self._qmember(index).component for index in indexes]
 
         elif isinstance(key, int):
             if key < 0:  # Handle negative indices
                 key += self._length
             if key < 0 or key >= self._length:
                 raise IndexError("queue index out of range")
-            mx = self._head.successor
-            count = 0
-            while mx != self._tail:
-                if count == key:
-                    return mx.component
-                count = count + 1
-                mx = mx.successor
-
-            return None  # just for safety
+            return self._qmember(key).component
 
         else:
             raise TypeError("Invalid argument type: " + object_to_str(key))
@@ -5211,33 +6015,30 @@ class Queue:
         return self._length
 
     def __reversed__(self):
-        self._iter_sequence += 1
-        iter_sequence = self._iter_sequence
-        self._iter_touched[iter_sequence] = False
+        version = self._version
         iter_list = []
         mx = self._tail.predecessor
         while mx != self._head:
             iter_list.append(mx)
             mx = mx.predecessor
         iter_index = 0
-        while len(iter_list) > iter_index or self._iter_touched[iter_sequence]:
-            if self._iter_touched[iter_sequence]:
+        while len(iter_list) > iter_index or self._version != version:
+            if self._version != version:
                 # place all taken qmembers on the list
                 iter_list = iter_list[:iter_index]
+                taken = set(iter_list)
                 mx = self._tail.predecessor
                 while mx != self._head:
-                    if mx not in iter_list:
+                    if mx not in taken:
                         iter_list.append(mx)
                     mx = mx.predecessor
-                self._iter_touched[iter_sequence] = False
+                version = self._version
             else:
                 c = iter_list[iter_index].component
                 if c is not None:  # skip deleted components
                     yield c
                 iter_index += 1
 
-        del self._iter_touched[iter_sequence]
-
     def __add__(self, other):
         if not isinstance(other, Queue):
             return NotImplemented
@@ -5358,34 +6159,30 @@ class Queue:
         return None
 
     def __iter__(self):
-        self._iter_sequence += 1
-        iter_sequence = self._iter_sequence
-        self._iter_touched[iter_sequence] = False
-
+        version = self._version
         iter_list = []
         mx = self._head.successor
         while mx != self._tail:
             iter_list.append(mx)
             mx = mx.successor
         iter_index = 0
-        while len(iter_list) > iter_index or self._iter_touched[iter_sequence]:
-            if self._iter_touched[iter_sequence]:
+        while len(iter_list) > iter_index or self._version != version:
+            if self._version != version:
                 # place all taken qmembers on the list
                 iter_list = iter_list[:iter_index]
+                taken = set(iter_list)
                 mx = self._head.successor
                 while mx != self._tail:
-                    if mx not in iter_list:
+                    if mx not in taken:
                         iter_list.append(mx)
                     mx = mx.successor
-                self._iter_touched[iter_sequence] = False
+                version = self._version
             else:
                 c = iter_list[iter_index].component
                 if c is not None:  # skip deleted components
                     yield c
                 iter_index += 1
 
-        del self._iter_touched[iter_sequence]
-
     def extend(self, source: Iterable, clear_source: bool = False) -> None:
         """
         extends the queue with components of source that are not already in self (at the end of self)
@@ -5408,13 +6205,15 @@ class Queue:
         ----
         The components in source added to the queue will get the priority of the tail of self.
         """
-        count = 0
+        components = []
+        added = set()
+        for c in source:
+            if c not in self and c not in added:
+                components.append(c)
+                added.add(c)
+        count = len(components)
         with self.env.suppress_trace():
-            self.env._trace = False
-            for c in source:
-                if c not in self:
-                    c.enter(self)
-                    count += 1
+            self._add_bulk(components)
         if self.env._trace:
             self.env.print_trace(
                 "",
@@ -5432,10 +6231,92 @@ class Queue:
             else:
                 raise TypeError("clear_source cannot be applied to instances of type" + str(type(source)))
 
-    def as_set(self):
-        return {c for c in self}
-
-    def as_list(self):
+    def _qmember_list(self) -> list:
+        # returns a list of all qmembers in self (in order)
+        members = []
+        mx = self._head.successor
+        while mx is not self._tail:
+            members.append(mx)
+            mx = mx.successor
+        return members
+
+    def _add_bulk(self, components: list, priorities: list = None) -> None:
+        # adds components (that should not be in self) at the tail of self.
+        # The linked list is spliced once and the level monitors are tallied once.
+        # If priorities is None, the components get the priority of the tail of self.
+        # For stores and if the capacity would be exceeded, the components are entered one by one.
+        if not components:
+            return
+        if priorities is None:
+            priorities = itertools.repeat(self._tail.predecessor.priority)
+        if isinstance(self, Store) or self._length + len(components) > self.capacity._tally:
+            for c, priority in zip(components, priorities):
+                Qmember().insert_in_front_of(self._tail, c, self, priority)
+            return
+        now = self.env._now
+        members = []
+        m1 = self._tail.predecessor
+        for c, priority in zip(components, priorities):
+            mx = Qmember()
+            m1.successor = mx
+            mx.predecessor = m1
+            mx.priority = priority
+            mx.component = c
+            mx.queue = self
+            mx.enter_time = now
+            c._qmembers[self] = mx
+            members.append(mx)
+            m1 = mx
+        m1.successor = self._tail
+        self._tail.predecessor = m1
+        self._length += len(members)
+        if self._priorities:
+            for mx in members:
+                if not self._priorities:
+                    break
+                self._priorities.add(mx)
+        if self._positions is not None:
+            self._positions.extend(members)
+        self._version += 1
+        self.length.tally(self._length)
+        self.available_quantity.tally(self.capacity._tally - self._length)
+        self.number_of_arrivals += len(members)
+
+    def _clear_bulk(self) -> None:
+        # removes all components from self.
+        # The linked list is cut once and the level monitors are tallied once.
+        # For stores, the components leave one by one (as that might honor to_store requests).
+        if isinstance(self, Store):
+            mx = self._head.successor
+            while mx != self._tail:
+                c = mx.component
+                mx = mx.successor
+                c.leave(self)
+            return
+        if self._length == 0:
+            return
+        now = self.env._now
+        length_of_stays = []
+        mx = self._head.successor
+        while mx is not self._tail:
+            del mx.component._qmembers[self]
+            mx.component = None  # signal for iterators that member is not in the queue
+            length_of_stays.append(now - mx.enter_time)
+            mx = mx.successor
+        self._head.successor = self._tail
+        self._tail.predecessor = self._head
+        self._length = 0
+        self._priorities = None
+        self._positions = None
+        self.length_of_stay._tally_many(length_of_stays)
+        self.length.tally(0)
+        self.available_quantity.tally(self.capacity._tally)
+        self.number_of_departures += len(length_of_stays)
+
+    def as_set(self):
+        return {c for c in self}
+
+    def as_list(self):
         return [c for c in self]
 
     def union(self, q: "Queue", name: str = None, monitor: bool = False) -> "Queue":
@@ -5477,17 +6358,8 @@ class Queue:
                 name = self.name() + " | " + q.name()
             q1 = type(self)(name=name, monitor=monitor, env=self.env)
             self_set = self.as_set()
-
-            mx = self._head.successor
-            while mx != self._tail:
-                Qmember().insert_in_front_of(q1._tail, mx.component, q1, 0)
-                mx = mx.successor
-
-            mx = q._head.successor
-            while mx != q._tail:
-                if mx.component not in self_set:
-                    Qmember().insert_in_front_of(q1._tail, mx.component, q1, 0)
-                mx = mx.successor
+            components = self.as_list() + [c for c in q if c not in self_set]
+            q1._add_bulk(components, itertools.repeat(0))
 
         return q1
 
@@ -5530,11 +6402,7 @@ class Queue:
                 name = self.name() + " & " + q.name()
             q1 = type(self)(name=name, monitor=monitor, env=self.env)
             q_set = q.as_set()
-            mx = self._head.successor
-            while mx != self._tail:
-                if mx.component in q_set:
-                    Qmember().insert_in_front_of(q1._tail, mx.component, q1, 0)
-                mx = mx.successor
+            q1._add_bulk([c for c in self if c in q_set], itertools.repeat(0))
         return q1
 
     def difference(self, q: "Queue", name: str = None, monitor: bool = False) -> "Queue":
@@ -5572,11 +6440,8 @@ class Queue:
         with self.env.suppress_trace():
             q1 = type(self)(name=name, monitor=monitor, env=self.env)
             q_set = q.as_set()
-            mx = self._head.successor
-            while mx != self._tail:
-                if mx.component not in q_set:
-                    Qmember().insert_in_front_of(q1._tail, mx.component, q1, mx.priority)
-                mx = mx.successor
+            members = [mx for mx in self._qmember_list() if mx.component not in q_set]
+            q1._add_bulk([mx.component for mx in members], [mx.priority for mx in members])
         return q1
 
     def symmetric_difference(self, q: "Queue", name: str = None, monitor: bool = False) -> "Queue":
@@ -5614,16 +6479,8 @@ class Queue:
             q1 = type(self)(name=name, monitor=monitor, env=self.env)
 
             intersection_set = self.as_set() & q.as_set()
-            mx = self._head.successor
-            while mx != self._tail:
-                if mx.component not in intersection_set:
-                    Qmember().insert_in_front_of(q1._tail, mx.component, q1, 0)
-                mx = mx.successor
-            mx = q._head.successor
-            while mx != q._tail:
-                if mx.component not in intersection_set:
-                    Qmember().insert_in_front_of(q1._tail, mx.component, q1, 0)
-                mx = mx.successor
+            components = [c for c in self if c not in intersection_set] + [c for c in q if c not in intersection_set]
+            q1._add_bulk(components, itertools.repeat(0))
 
         return q1
 
@@ -5663,10 +6520,8 @@ class Queue:
             q1 = type(self)(name=name, monitor=monitor, env=self.env)
             if copy_capacity:
                 q1.capacity._tally = self.capacity._tally
-            mx = self._head.successor
-            while mx != self._tail:
-                Qmember().insert_in_front_of(q1._tail, mx.component, q1, mx.priority)
-                mx = mx.successor
+            members = self._qmember_list()
+            q1._add_bulk([mx.component for mx in members], [mx.priority for mx in members])
         return q1
 
     def move(self, name: str = None, monitor: bool = False, copy_capacity=False):
@@ -5710,19 +6565,26 @@ class Queue:
         removes all components from a queue
         """
         with self.env.suppress_trace():
-            mx = self._head.successor
-            while mx != self._tail:
-                c = mx.component
-                mx = mx.successor
-                c.leave(self)
+            self._clear_bulk()
         if self.env._trace:
             self.env.print_trace("", "", self.name() + " clear")
 
 
 class Store(Queue):
-    def __init__(self, name: str = None, monitor: Any = True, fill: Iterable = None, capacity: float = inf, env: "Environment" = None, *args, **kwargs) -> None:
+    def __init__(
+        self, name: str = None, monitor: Any = True, fill: Iterable = None, capacity: float = inf, env: "Environment" = None, key: Callable = None, *args, **kwargs
+    ) -> None:
         super().__init__(name=name, monitor=monitor, fill=None, capacity=capacity, env=env, *args, **kwargs)
 
+        # if key is given, the items are indexed on key(item), so from_store(match=...) is a hash lookup
+        self._key = key
+        self._item_keys = {}  # item: key
+        self._items_by_key = {}  # key: [first item, last item] of the items with that key (see _key_links)
+        self._key_links = {}  # item: [previous item, next item] with the same key, in the order of the store (or None)
+        self._match_requesters = {}  # match: {requester: None} (in order of request)
+        self._number_of_filter_requesters = 0  # number of from_store requesters without match
+        self._changed_items = {}  # items marked as changed, to be rescanned
+
         with self.env.suppress_trace():
             self._to_store_requesters = Queue(f"{name}.to_store_requesters", env=env)
             self._to_store_requesters._isinternal = True
@@ -5771,23 +6633,235 @@ class Store(Queue):
         """
         return self._to_store_requesters
 
-    def rescan(self):
+    def key(self) -> Optional[Callable]:
         """
-        Rescan for any components to be allowed from.
+        Returns
+        -------
+        the key function of the store, if any. None otherwise : callable
         """
+        return self._key
+
+    def rescan(self, items: Iterable = None) -> None:
+        """
+        Rescan for any components to be allowed from.
+
+        Parameters
+        ----------
+        items : iterable of components
+            if given, only these items (if in the store) are retested against the from_store requesters,
+            in the given order.
+
+            if omitted (default), all requesters are retested against all items in the store
+
+        Note
+        ----
+        Should be called after the attributes of items that are used in from_store filters (or the key function)
+        have changed. If only a few items have changed, specifying items is much faster than a full rescan.
+
+        For keyed stores, the key of the (given) items will be reevaluated.
+        """
+        if items is not None:
+            for item in items:
+                if item in self:
+                    if self._key is not None:
+                        self._update_item_key(item)
+                    requester = self._from_store_requester_for(item)
+                    if requester is not None:
+                        with self.env.suppress_trace():
+                            self.remove(item)
+                        self._honor_from_store(requester, item)
+            return
+        if self._key is not None:
+            for item in self:
+                self._update_item_key(item)
         for c in self._from_store_requesters:
-            for item in list(self):
-                if c._from_store_filter(item):
-                    for store in c._from_stores:
-                        c.leave(store._from_store_requesters)
-                    with self.env.suppress_trace():
-                        self.remove(item)
-                    c._from_stores = []
-                    c._from_store_item = item
-                    c._from_store_store = self
-                    c._remove()
-                    c.status._value = scheduled
-                    c._reschedule(c.env._now, 0, False, f"from_store ({self.name()}) honor with {item.name()}", False, s0=c.env.last_s0, return_value=item)
+            item = self._item_for(c)
+            if item is not None:
+                with self.env.suppress_trace():
+                    self.remove(item)
+                self._honor_from_store(c, item)
+
+    def changed(self, item: "Component") -> None:
+        """
+        marks an item as changed
+
+        Parameters
+        ----------
+        item : Component
+            item of which attributes that are used in from_store filters (or the key function) have changed
+
+        Note
+        ----
+        All items marked as changed within the same time instant are retested against the from_store requesters
+        just once, with a rescan restricted to these items, which is scheduled urgently at the current time.
+        """
+        if not self._changed_items:
+            self.env.schedule(self._rescan_changed, urgent=True)
+        self._changed_items[item] = None
+
+    def _rescan_changed(self):
+        items = self._changed_items
+        self._changed_items = {}
+        self.rescan(items=items)
+
+    def _add_item_key(self, item):
+        # should be called after item has entered the store
+        key = self._key(item)
+        self._item_keys[item] = key
+        self._link_item(item, key)
+
+    def _update_item_key(self, item):
+        # reevaluates the key of item, which is only moved to another key if the key has changed
+        key = self._key(item)
+        old_key = self._item_keys[item]
+        if key != old_key:
+            self._unlink_item(item, old_key)
+            self._item_keys[item] = key
+            self._link_item(item, key)
+
+    def _remove_item_key(self, item):
+        self._unlink_item(item, self._item_keys.pop(item))
+
+    def _relink_item(self, item):
+        # should be called after the position of item in the store has changed (by a priority change)
+        key = self._item_keys[item]
+        self._unlink_item(item, key)
+        self._link_item(item, key)
+
+    def _link_item(self, item, key):
+        # links item into the items with the given key, according to its position in the store
+        key_links = self._key_links
+        ends = self._items_by_key.get(key)
+        if ends is None:
+            self._items_by_key[key] = [item, item]
+            key_links[item] = [None, None]
+            return
+        previous_item = self._previous_item_with_key(item, key, ends)
+        if previous_item is None:
+            next_item = ends[0]
+            ends[0] = item
+        else:
+            next_item = key_links[previous_item][1]
+            key_links[previous_item][1] = item
+        if next_item is None:
+            ends[1] = item
+        else:
+            key_links[next_item][0] = item
+        key_links[item] = [previous_item, next_item]
+
+    def _unlink_item(self, item, key):
+        key_links = self._key_links
+        previous_item, next_item = key_links.pop(item)
+        ends = self._items_by_key[key]
+        if previous_item is None:
+            ends[0] = next_item
+        else:
+            key_links[previous_item][1] = next_item
+        if next_item is None:
+            ends[1] = previous_item
+        else:
+            key_links[next_item][0] = previous_item
+        if ends[0] is None:
+            del self._items_by_key[key]
+
+    def _previous_item_with_key(self, item, key, ends):
+        # returns the last item with the given key in front of item in the store (None if none)
+        mx = item._qmembers[self]
+        if mx.successor is self._tail:  # entered at the tail, which is the usual case
+            return ends[1]
+        if mx.predecessor is self._head:
+            return None
+        # search in both directions, so the number of steps is the distance to the nearest item with the same key
+        item_keys = self._item_keys
+        m1 = mx.predecessor
+        m2 = mx.successor
+        while True:
+            if m1 is self._head:
+                return None
+            if item_keys[m1.component] == key:
+                return m1.component
+            m1 = m1.predecessor
+            if m2 is not self._tail:
+                if item_keys[m2.component] == key:
+                    return self._key_links[m2.component][0]
+                m2 = m2.successor
+
+    def _items_with_key(self, key):
+        # yields the items with the given key, in the order of the store
+        ends = self._items_by_key.get(key)
+        item = None if ends is None else ends[0]
+        while item is not None:
+            next_item = self._key_links[item][1]
+            yield item
+            item = next_item
+
+    def _accepts(self, requester, item):
+        match = requester._from_store_match
+        if match is not None and self._item_keys.get(item) != match:
+            return False
+        return requester._from_store_filter(item)
+
+    def _item_for(self, requester):
+        # returns the first item in the store that satisfies the request of requester, if any. None otherwise
+        if requester._from_store_match is None:
+            items = self
+        else:
+            items = self._items_with_key(requester._from_store_match)
+        for item in items:
+            if requester._from_store_filter(item):
+                return item
+        return None
+
+    def _from_store_requester_for(self, item):
+        # returns the first from_store requester that accepts item, if any. None otherwise
+        if self._number_of_filter_requesters or self._key is None:
+            for requester in self._from_store_requesters:
+                if self._accepts(requester, item):
+                    return requester
+            return None
+        requesters = self._match_requesters.get(self._item_keys[item])
+        if not requesters:
+            return None
+        found_requester = None
+        for requester in requesters:
+            if requester._from_store_filter(item):
+                priority = requester._qmembers[self._from_store_requesters].priority
+                if found_requester is None or priority < found_priority:
+                    found_requester = requester
+                    found_priority = priority
+        return found_requester
+
+    def _add_from_store_requester(self, requester, request_priority):
+        requester.enter_sorted(self._from_store_requesters, priority=request_priority)
+        match = requester._from_store_match
+        if match is None:
+            self._number_of_filter_requesters += 1
+        else:
+            self._match_requesters.setdefault(match, {})[requester] = None
+
+    def _remove_from_store_requester(self, requester):
+        requester.leave(self._from_store_requesters)
+        match = requester._from_store_match
+        if match is None:
+            self._number_of_filter_requesters -= 1
+        else:
+            requesters = self._match_requesters[match]
+            del requesters[requester]
+            if not requesters:
+                del self._match_requesters[match]
+
+    def _honor_from_store(self, requester, item):
+        # item should have left the store already
+        for store in requester._from_stores:
+            store._remove_from_store_requester(requester)
+        requester._from_stores = ()
+        requester._from_store_item = item
+        requester._from_store_store = self
+        requester._remove()
+        requester.status._value = scheduled
+        requester._reschedule(
+            requester.env._now, 0, False, f"from_store ({self.name()}) honor with {item.name()}", False, s0=requester.env.last_s0, return_value=item
+        )
 
     def _rescan_to(self):
         """
@@ -5799,7 +6873,7 @@ class Store(Queue):
                     c.leave(store._to_store_requesters)
                 with self.env.suppress_trace():
                     c._to_store_item.enter_sorted(self, c._to_store_priority)
-                c._to_stores = []
+                c._to_stores = ()
                 c._remove()
                 c.status._value = scheduled
                 c._reschedule(c.env._now, 0, False, f"to_store ({self.name()}) honor ", False, s0=c.env.last_s0)
@@ -5860,7 +6934,7 @@ class Animate3dBase(DynamicClass):
         if parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
 
         self.sequence = self.env.serialize()
         self.env.an_objects3d.add(self)
@@ -7103,25 +8177,24 @@ class Component:
         _set_name(name, self.env._nameserializeComponent, self)
         self._qmembers = {}
         self._process = None
-        self.status = _StatusMonitor(name=self.name() + ".status", level=True, initial_tally=data, env=self.env)
+        if self.env._component_monitors:
+            self.status = _StatusMonitor(name=self.name() + ".status", level=True, initial_tally=data, env=self.env)
+        else:
+            self.status = _StatusValue(self, data)
 
-        self._requests = collections.OrderedDict()
-        self._claims = collections.OrderedDict()
-        self._waits = []
-        self._from_stores = []
-        self._to_stores = []
-        self._on_event_list = False
+        self._event_entry = None
         self._scheduled_time = inf
         self._failed = False
         self._skip_standby = skip_standby
         self._creation_time = self.env._now
         self._suppress_trace = suppress_trace
         self._suppress_pause_at_step = suppress_pause_at_step
-        self.mode = _ModeMonitor(parent=self, name=self.name() + ".mode", level=True, initial_tally=mode, env=self.env)
+        if self.env._component_monitors:
+            self.mode = _ModeMonitor(parent=self, name=self.name() + ".mode", level=True, initial_tally=mode, env=self.env)
+        else:
+            self.mode = _ModeValue(self, mode)
 
         self._mode_time = self.env._now
-        self._aos = {}
-        self._animation_children = set()
 
         if process is None:
             if hasattr(self, "process"):
@@ -7221,6 +8294,19 @@ by adding at the end:
 
     overridden_lineno = None
 
+    # the rarely used containers below are only allocated per component when actually used
+    _requests = _empty_mapping
+    _claims = _empty_mapping
+    _waits = ()
+    _from_stores = ()
+    _from_store_match = None
+    _watched_resource = None
+    _watchable_request = False
+    _cond_tracked = False
+    _to_stores = ()
+    _aos = _empty_mapping
+    _animation_children = frozenset()
+
     def animation_objects(self, id: Any, screen_coordinates: bool = True) -> Tuple:
         """
         defines how to display a component in AnimateQueue
@@ -7329,7 +8415,7 @@ by adding at the end:
     def __repr__(self):
         return object_to_str(self) + " (" + self.name() + ")"
 
-    def reset_monitors(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset_monitors(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None) -> None:
         """
         resets the monitor for the component's status and mode monitors
 
@@ -7348,9 +8434,14 @@ by adding at the end:
             if False, full functionality
 
             if omittted, no change of stats_only
+
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if omitted, no change of percentile_error
         """
-        self.status.reset(monitor=monitor, stats_only=stats_only)
-        self.mode.reset(monitor=monitor, stats_only=stats_only)
+        self.status.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
+        self.mode.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
     def register(self, registry: List) -> "Component":
         """
@@ -7456,29 +8547,26 @@ by adding at the end:
                 result.append("    " + pad(s.name(), 20) + " value=" + str(value))
         return return_or_print(result, as_str, file)
 
-    def _push(self, t, priority, urgent, return_value=None, switch=True):
+    def _push(self, t, priority, urgent, return_value=None, switch=True, timeout=False):
         if t != inf:
             self.env._seq += 1
             if urgent:
                 seq = -self.env._seq
             else:
                 seq = self.env._seq
-            self._on_event_list = True
-            heapq.heappush(self.env._event_list, (t, priority, seq, self, return_value))
+            self._event_entry = [t, priority, seq, self, return_value]
+            if not (timeout and self.env._timeouts.push(self._event_entry, self.env._now)):
+                self.env._event_list.push(self._event_entry)
         if self.env._yieldless:
             if self is self.env._current_component:
                 self.env._glet.switch()
 
     def _remove(self):
-        if self._on_event_list:
-            for i in range(len(self.env._event_list)):
-                if self.env._event_list[i][3] == self:
-                    self.env._event_list[i] = self.env._event_list[0]
-                    self.env._event_list.pop(0)
-                    heapq.heapify(self.env._event_list)
-                    self._on_event_list = False
-                    return
-            raise Exception("remove error", self.name())
+        if self._event_entry is not None:
+            if not self.env._timeouts.remove(self._event_entry):
+                self.env._event_list.remove(self._event_entry)
+            self._event_entry = None
+            return
         if self.status.value == standby:
             if self in self.env._standbylist:
                 self.env._standbylist.remove(self)
@@ -7491,9 +8579,11 @@ by adding at the end:
                 self.env.print_trace("", "", self.name(), "request failed")
             for r in list(self._requests):
                 self.leave(r._requesters)
-                if r._requesters._length == 0:
-                    r._minq = inf
-            self._requests = collections.OrderedDict()
+                r._remove_requester(self)
+            self._requests = _empty_mapping
+            if self._watchable_request:
+                self._watchable_request = False
+                self._watched_resource = None
             self._failed = True
 
         if self._waits:
@@ -7502,15 +8592,16 @@ by adding at the end:
             for state, _, _ in self._waits:
                 if self in state._waiters:  # there might be more values for this state
                     self.leave(state._waiters)
-            self._waits = []
+                    state._remove_waiter(self)
+            self._waits = ()
             self._failed = True
 
         if self._from_stores:
             if self.env._trace:
                 self.env.print_trace("", "", self.name(), "from_store failed")
             for store in list(self._from_stores):
-                self.leave(store._from_store_requesters)
-            self._from_stores = []
+                store._remove_from_store_requester(self)
+            self._from_stores = ()
             self._failed = True
 
         if self._to_stores:
@@ -7518,10 +8609,10 @@ by adding at the end:
                 self.env.print_trace("", "", self.name(), "to_store failed")
             for store in list(self._to_stores):
                 self.leave(store._to_store_requesters)
-            self._to_stores = []
+            self._to_stores = ()
             self._failed = True
 
-    def _reschedule(self, scheduled_time, priority, urgent, caller, cap_now, extra="", s0=None, return_value=None):
+    def _reschedule(self, scheduled_time, priority, urgent, caller, cap_now, extra="", s0=None, return_value=None, timeout=False):
         if scheduled_time < self.env._now:
             if cap_now is None:
                 cap_now = g._default_cap_now
@@ -7548,7 +8639,7 @@ by adding at the end:
                 merge_blanks(scheduled_time_str + _prioritytxt(priority) + _urgenttxt(urgent) + lineno, self._modetxt(), extra),
                 s0=s0,
             )
-        self._push(scheduled_time, priority, urgent, return_value)
+        self._push(scheduled_time, priority, urgent, return_value, timeout=timeout)
 
     def activate(
         self,
@@ -8068,6 +9159,7 @@ by adding:
         self.set_mode(mode)
         caller = "standby"
         self.env._standbylist.append(self)
+        self.env._run_fast = False
         self.status._value = standby
 
         if self.env._trace:
@@ -8093,6 +9185,7 @@ by adding:
         mode: str = None,
         cap_now: bool = None,
         key: callable = None,
+        match: Hashable = None,
     ) -> "Component":
         """
         get item from store(s)
@@ -8174,6 +9267,17 @@ by adding:
 
             If omitted, no sorting will be applied.
 
+        match : hashable
+            if given, only components with store.key()(component) == match will be considered.
+
+            This requires that all stores are defined with a key function, e.g.
+            ``Store("warehouse", key=lambda item: item.sku)``
+
+            As the components are looked up by their key, this is much faster than the equivalent
+            ``filter=lambda item: item.sku == sku``, particularly for stores with many components.
+
+            if omitted, no match will be applied
+
         Note
         ----
         Only allowed for current component
@@ -8192,6 +9296,10 @@ by adding:
                 raise ValueError("one or more stores specified more than once")
             if len(from_stores) == 0:
                 raise ValueError("no stores specified")
+        if match is not None:
+            for store in from_stores:
+                if store._key is None:
+                    raise ValueError(f"match specified, but {store.name()} has no key function")
 
         if self.status.value != current:
             self._checkisnotdata()
@@ -8226,7 +9334,7 @@ by adding:
         found_key = None
         done = False
         for store in from_stores:
-            for c in store:
+            for c in store if match is None else store._items_with_key(match):
                 if filter(c):
                     if key:
                         this_key = key(c)
@@ -8251,13 +9359,14 @@ by adding:
             return self._from_store_item
 
         self._from_stores = from_stores
+        self._from_store_match = match
         for store in from_stores:
-            self.enter_sorted(store._from_store_requesters, priority=request_priority)
+            store._add_from_store_requester(self, request_priority)
         self.status._value = requesting
         self._from_store_item = None
         self._from_store_filter = filter
 
-        self._reschedule(scheduled_time, fail_priority, urgent, "request from_store", cap_now)
+        self._reschedule(scheduled_time, fail_priority, urgent, "request from_store", cap_now, timeout=True)
         if self.env._yieldless:
             return self._from_store_item
 
@@ -8397,7 +9506,7 @@ by adding:
                 item.enter_sorted(q, priority)
                 self._to_store_item = None
                 self._to_store_store = store
-                self._to_stores = []
+                self._to_stores = ()
                 self._remove()
                 self.status._value = scheduled
                 self._reschedule(self.env._now, 0, False, f"to_store ({store.name()}) honor with {item.name()}", False, s0=self.env.last_s0)
@@ -8411,7 +9520,7 @@ by adding:
         self._to_stores = to_stores
 
         if self._to_store_item:
-            self._reschedule(scheduled_time, fail_priority, urgent, "request to_store", cap_now)
+            self._reschedule(scheduled_time, fail_priority, urgent, "request to_store", cap_now, timeout=True)
 
     def filter(self, value: callable):
         """
@@ -8560,13 +9669,12 @@ by adding:
         --> requests 1 from r1, r2 or r3
 
         """
-        self.oneof_request = oneof
-
         if self.status.value != current:
             self._checkisnotdata()
             self._checkisnotmain()
             self._remove()
             self._check_fail()
+        self.oneof_request = oneof  # not earlier, as _check_fail needs the previous value
         if fail_at is None:
             if fail_delay is None:
                 scheduled_time = inf
@@ -8586,6 +9694,7 @@ by adding:
         self.set_mode(mode)
 
         self._failed = False
+        self._requests = collections.OrderedDict()
 
         if not args:
             honoredstr = "-"
@@ -8650,9 +9759,11 @@ by adding:
                     for c in bump_candidates:
                         c._release(r, bumped_by=self)
                         c.activate()
-        for r, q in self._requests.items():
-            if q < r._minq:
-                r._minq = q
+        if len(self._requests) > 1 and not self.oneof_request and all(q > 0 and not r._honor_only_first and not r._honor_only_highest_priority for r, q in self._requests.items()):
+            self._watchable_request = True
+            self._watched_resource = next(iter(self._requests))  # will be changed into a resource that blocks the request
+        for r in self._requests:
+            r._add_requester(self)
 
         self._remaining_duration = scheduled_time - self.env._now
 
@@ -8660,7 +9771,7 @@ by adding:
 
         if self._requests:
             self.status._value = requesting
-            self._reschedule(scheduled_time, schedule_priority, urgent, "request", cap_now)
+            self._reschedule(scheduled_time, schedule_priority, urgent, "request", cap_now, timeout=True)
 
     def isbumped(self, resource: "Resource" = None) -> bool:
         """
@@ -8718,8 +9829,7 @@ by adding:
         for r in self._requests:
             if r._honor_only_first and r._requesters[0] != self:
                 return []
-            self_prio = self.priority(r._requesters)
-            if r._honor_only_highest_priority and self_prio != r._requesters._head.successor.priority:
+            if r._honor_only_highest_priority and self.priority(r._requesters) != r._requesters._head.successor.priority:
                 return []
             if self._requests[r] > 0:
                 if self._requests[r] > (r._capacity - r._claimed_quantity + 1e-8):
@@ -8733,8 +9843,7 @@ by adding:
         for r in self._requests:
             if r._honor_only_first and r._requesters[0] != self:
                 continue
-            self_prio = self.priority(r._requesters)
-            if r._honor_only_highest_priority and self_prio != r._requesters._head.successor.priority:
+            if r._honor_only_highest_priority and self.priority(r._requesters) != r._requesters._head.successor.priority:
                 continue
 
             if self._requests[r] > 0:
@@ -8766,6 +9875,8 @@ by adding:
                     if r._anonymous:
                         prio_trace = ""
                     else:
+                        if not self._claims:
+                            self._claims = collections.OrderedDict()
                         if r in self._claims:
                             self._claims[r] += self._requests[r]
                         else:
@@ -8780,20 +9891,54 @@ by adding:
                     if self.env._trace:
                         self.env.print_trace("", "", self.name(), f"claim {self._requests[r]} from {r.name()} {prio_trace}")
                 self.leave(r._requesters)
-                if r._requesters._length == 0:
-                    r._minq = inf
+                r._remove_requester(self)
 
-            self._requests = collections.OrderedDict()
+            self._requests = _empty_mapping
+            if self._watchable_request:
+                self._watchable_request = False
+                self._watched_resource = None
             self._remove()
             honoredstr = r_honor[0].name() + (len(r_honor) > 1) * " ++"
             self.status._value = scheduled
             self._reschedule(self.env._now, 0, False, "request honor " + honoredstr, False, s0=self.env.last_s0)
+            for r in anonymous_resources:
+                r._rewatch()  # before any requesters are visited, as the resources might be freed all at once
             for r in anonymous_resources:
                 r._tryrequest()
             return True
         else:
+            if self._watchable_request:
+                self._watch_blocking_resource()
             return False
 
+    def _watch_blocking_resource(self):
+        # A request for several resources (without oneof, puts, honor_only_first or honor_only_highest_priority) is only
+        # visited by the resource it watches, which is a resource that can't honor the request.
+        # Releases of the other resources, that can't make the request possible, thus don't evaluate the request.
+        # If none of the resources blocks the request, all resources watch it (_watched_resource is None), so it is
+        # visited in the order of the requesters by whichever resource tries first.
+        watched_resource = self._watched_resource
+        for r, q in self._requests.items():
+            if q > r._capacity - r._claimed_quantity + 1e-8:
+                if r is not watched_resource:
+                    if watched_resource is None:
+                        for other in self._requests:
+                            if other is not r:
+                                other._unwatch(self)
+                    else:
+                        watched_resource._unwatch(self)
+                        del watched_resource._watched_requesters[self]
+                        r._watch(self)
+                    self._watched_resource = r
+                    r._watched_requesters[self] = None
+                return
+        if watched_resource is not None:
+            del watched_resource._watched_requesters[self]
+            self._watched_resource = None
+            for other in self._requests:
+                if other is not watched_resource:
+                    other._watch(self)
+
     def _release(self, r, q=None, s0=None, bumped_by=None):
         if r not in self._claims:
             raise ValueError(self.name() + " not claiming from resource " + r.name())
@@ -8880,7 +10025,7 @@ by adding:
             for r in list(self._claims):
                 self._release(r)
 
-    def wait_for(self, cond, states, request_priority=0, priority=0, urgent=False, mode=None, fail_delay=None, fail_at=None, cap_now=None):
+    def wait_for(self, cond, states=None, request_priority=0, priority=0, urgent=False, mode=None, fail_delay=None, fail_at=None, cap_now=None):
         """
         wait for any or all of the given state values are met
 
@@ -8892,6 +10037,11 @@ by adding:
         states : iterable
             specicies which states should trigger the cond to be checked
 
+            if omitted, the states that are read by cond (with state(), state.get() or state.value())
+            are tracked, each time cond is evaluated. Then, cond is only evaluated again if any of these
+            states changes, and just once per time instant (with urgent priority), even if several of these states
+            change. Note that in that case the temporary value of a state.trigger() will not be seen by cond.
+
         request_priority : float
             put component in waiters queue according to the given priority (deafult 0)
 
@@ -8986,23 +10136,32 @@ by adding:
         schedule_priority = priority
 
         self._cond = cond  # add test ***
-        for state in states:
-            self._waits.append((state, None, None))
-            if priority is None:
-                self.enter(state._waiters)
-            else:
-                self.enter_sorted(state._waiters, priority)
-
-        if not self._waits:
-            raise TypeError("no states specified")
-
+        self._cond_tracked = states is None
+        self._waits = []
         self._remaining_duration = scheduled_time - self.env._now
+        if self._cond_tracked:
+            self._cond_request_priority = request_priority
+            # the states are registered while evaluating cond
+            if not self._trywait() and not self._waits:
+                raise TypeError("cond doesn't read any state")
+        else:
+            for state in states:
+                self._waits.append((state, None, None))
+                if priority is None:
+                    self.enter(state._waiters)
+                else:
+                    self.enter_sorted(state._waiters, priority)
 
-        self._trywait()
+            if not self._waits:
+                raise TypeError("no states specified")
+            for state in dict.fromkeys(state for state, _, _ in self._waits):
+                state._add_waiter(self)
+
+            self._trywait()
 
         if self._waits:
             self.status._value = waiting
-            self._reschedule(scheduled_time, schedule_priority, urgent, "wait_for", cap_now)
+            self._reschedule(scheduled_time, schedule_priority, urgent, "wait_for", cap_now, timeout=True)
         else:
             return
 
@@ -9116,7 +10275,8 @@ by adding:
 
           yield self.wait((light,"red"))
         * an expression, containg one or more $-signs
-          the $ is replaced by state.value(), each time the condition is tested.
+          the $ stands for state.value(), each time the condition is tested.
+          The expression is compiled only once (per different expression).
 
           self refers to the component under test, state refers to the state
           under test.
@@ -9161,6 +10321,8 @@ by adding:
 
         """
         self._cond = None
+        if self._cond_tracked:
+            self._cond_tracked = False
 
         if self.status.value != current:
             self._checkisnotdata()
@@ -9189,6 +10351,7 @@ by adding:
         schedule_priority = priority
         self.set_mode(mode)
 
+        self._waits = []
         for arg in args:
             value = True
             priority = request_priority
@@ -9218,12 +10381,14 @@ by adding:
             if inspect.isfunction(value):
                 self._waits.append((state, value, 2))
             elif "$" in str(value):
-                self._waits.append((state, value, 1))
+                self._waits.append((state, _WaitExpression(value), 1))
             else:
                 self._waits.append((state, value, 0))
 
         if not self._waits:
             raise TypeError("no states specified")
+        for state in dict.fromkeys(state for state, _, _ in self._waits):
+            state._add_waiter(self)
 
         self._remaining_duration = scheduled_time - self.env._now
 
@@ -9231,14 +10396,16 @@ by adding:
 
         if self._waits:
             self.status._value = waiting
-            self._reschedule(scheduled_time, schedule_priority, urgent, "wait", cap_now)
+            self._reschedule(scheduled_time, schedule_priority, urgent, "wait", cap_now, timeout=True)
         else:
             return
 
     def _trywait(self):
         if self.status.value == interrupted:
             return False
-        if self._cond:
+        if self._cond_tracked:
+            honored = self._evaluate_tracked_cond()
+        elif self._cond:
             honored = self._cond()
         else:
             if self._wait_all:
@@ -9249,7 +10416,7 @@ by adding:
                             honored = False
                             break
                     elif valuetype == 1:
-                        if not eval(value.replace("$", "state._value")):
+                        if not value.condition(self, state):
                             honored = False
                             break
                     elif valuetype == 2:
@@ -9265,7 +10432,7 @@ by adding:
                             honored = True
                             break
                     elif valuetype == 1:
-                        if eval(value.replace("$", str(state._value))):
+                        if value.condition(self, state):
                             honored = True
                             break
                     elif valuetype == 2:
@@ -9277,13 +10444,47 @@ by adding:
             for s, _, _ in self._waits:
                 if self in s._waiters:  # there might be more values for this state
                     self.leave(s._waiters)
-            self._waits = []
+                    s._remove_waiter(self)
+            self._waits = ()
             self._remove()
             self.status._value = scheduled
             self._reschedule(self.env._now, 0, False, "wait honor", False, s0=self.env.last_s0)
 
         return honored
 
+    def _evaluate_tracked_cond(self):
+        # evaluates cond of a wait_for without states and makes this component a waiter of exactly the states
+        # that were read (these may differ per evaluation)
+        env = self.env
+        outer_state_reads = env._state_reads  # a condition might be evaluated while evaluating another condition
+        env._state_reads = {}
+        try:
+            honored = self._cond()
+        finally:
+            states = env._state_reads
+            env._state_reads = outer_state_reads
+        if not honored:
+            old_states = {state: None for state, _, _ in self._waits}
+            if states.keys() != old_states.keys():
+                for state in old_states:
+                    if state not in states:
+                        self.leave(state._waiters)
+                        state._remove_waiter(self)
+                for state in states:
+                    if state not in old_states:
+                        self.enter_sorted(state._waiters, self._cond_request_priority)
+                        state._add_waiter(self)
+                self._waits = [(state, None, None) for state in states]
+        return honored
+
+    def _pend_condition(self):
+        # a state read by the condition of a wait_for without states has changed.
+        # The condition will be evaluated just once at this time instant, however many states change.
+        pending_conditions = self.env._pending_conditions
+        if not pending_conditions:
+            self.env.schedule(self.env._evaluate_pending_conditions, urgent=True)
+        pending_conditions[self] = None
+
     def claimed_quantity(self, resource: "Resource" = None) -> float:
         """
         Parameters
@@ -9401,7 +10602,12 @@ by adding:
         """
         for ao in self._animation_children:
             ao.remove()
-        self._animation_children = set()
+        self._animation_children = frozenset()
+
+    def _add_animation_child(self, ao):
+        if not self._animation_children:
+            self._animation_children = set()
+        self._animation_children.add(ao)
 
     def suppress_trace(self, value: bool = None) -> bool:
         """
@@ -9623,6 +10829,10 @@ by adding:
         if m1 is None:
             return -1
         else:
+            if q._positions is None and q._length >= _QueuePositions.minimum_length:
+                _QueuePositions(q)
+            if q._positions is not None:
+                return q._positions.index(m1)
             mx = q._head.successor
             index = 0
             while mx != m1:
@@ -9650,7 +10860,11 @@ by adding:
             priority = q._tail.predecessor.priority
             Qmember().insert_in_front_of(q._tail, self, q, priority)
         else:
-            if q._length >= 1 and priority < q._head.successor.priority:  # direct enter component that's smaller than the rest
+            if q._priorities is None:
+                _QueuePriorities(q)
+            if q._priorities:
+                m2 = q._priorities.insertion_point(priority)
+            elif q._length >= 1 and priority < q._head.successor.priority:  # direct enter component that's smaller than the rest
                 m2 = q._head.successor
             else:
                 m2 = q._tail
@@ -9771,6 +10985,15 @@ by adding:
         mx.component = None
         # signal for components method that member is not in the queue
         q._length -= 1
+        if q._priorities:
+            q._priorities.remove(mx)
+        elif q._length == 0:
+            q._priorities = None  # an empty queue is sorted by definition
+        if q._positions is not None:
+            if q._length == 0:
+                q._positions = None
+            else:
+                q._positions.remove(mx)
         del self._qmembers[q]
         if self.env._trace:
             if not q._isinternal:
@@ -9783,6 +11006,8 @@ by adding:
 
         if isinstance(q, Store):
             store = q
+            if store._key is not None:
+                store._remove_item_key(self)
             available_quantity = q.capacity._tally - q._length
             if available_quantity > 0:
                 if len(store._to_store_requesters) > 0:
@@ -9791,7 +11016,7 @@ by adding:
                         requester._to_store_item.enter_sorted(q, requester._to_store_priority)
                     for store0 in requester._to_stores:
                         requester.leave(store0._to_store_requesters)
-                    requester._to_stores = []
+                    requester._to_stores = ()
                     requester._remove()
                     requester.status._value = scheduled
                     requester._reschedule(requester.env._now, 0, False, f"to_store ({store.name()}) honor ", False, s0=requester.env.last_s0)
@@ -9826,12 +11051,22 @@ by adding:
         if priority is not None:
             if priority != mx.priority:
                 # leave.sort is not possible, because statistics will be affected
+                if q._priorities is None:
+                    _QueuePriorities(q)
+                priorities = q._priorities
+                if priorities:
+                    priorities.remove(mx)
+                if q._positions is not None:
+                    q._positions.remove(mx)
                 mx.predecessor.successor = mx.successor
                 mx.successor.predecessor = mx.predecessor
 
-                m2 = q._head.successor
-                while (m2 != q._tail) and (m2.priority <= priority):
-                    m2 = m2.successor
+                if priorities:
+                    m2 = priorities.insertion_point(priority)
+                else:
+                    m2 = q._head.successor
+                    while (m2 != q._tail) and (m2.priority <= priority):
+                        m2 = m2.successor
 
                 m1 = m2.predecessor
                 m1.successor = mx
@@ -9839,8 +11074,15 @@ by adding:
                 mx.predecessor = m1
                 mx.successor = m2
                 mx.priority = priority
-                for iter in q._iter_touched:
-                    q._iter_touched[iter] = True
+                if priorities:
+                    priorities.add(mx)
+                if q._positions is not None:
+                    q._positions.add(mx)
+                q._version += 1
+                if isinstance(q, Store) and q._key is not None:
+                    q._relink_item(self)
+                if q._owner is not None:
+                    q._owner._rekey_member(self)
         return mx.priority
 
     def successor(self, q: "Queue") -> "Component":
@@ -9915,15 +11157,10 @@ by adding:
         -------
         priority the component is scheduled with : float
             returns None otherwise
-
-        Note
-        ----
-        The method has to traverse the event list, so performance may be an issue.
         """
-        for t, priority, seq, component, return_value in self.env._event_list:
-            if component is self:
-                return priority
-        return None
+        if self._event_entry is None:
+            return None
+        return self._event_entry[1]
 
     def remaining_duration(self, value: float = None, priority: float = 0, urgent: bool = False) -> float:
         """
@@ -10332,63 +11569,600 @@ class Event(Component):
             **kwargs,
         )
 
-    def process_yield(self):
-        self.env.print_trace("", "", self._action_string, "")
-        self._action()
-        self._action_taken = True
-        return
-        yield 1  # just to make it a generator
+    def process_yield(self):
+        self.env.print_trace("", "", self._action_string, "")
+        self._action()
+        self._action_taken = True
+        return
+        yield 1  # just to make it a generator
+
+    def process(self):
+        self.env.print_trace("", "", self._action_string, "")
+        self._action()
+        self._action_taken = True
+
+    def action(self, value=None):
+        """
+        action
+
+        Parameters
+        ----------
+        value : callable
+            new action callable
+
+        Returns
+        -------
+        current action : callable
+        """
+        if value is not None:
+            self._action = value
+        return self._action
+
+    def action_string(self, value=None):
+        """
+        action_string
+
+        Parameters
+        ----------
+        value : string
+            new action_string
+
+        Returns
+        -------
+        current action_string : string
+        """
+
+        if value is not None:
+            self._action_string = value
+        return self._action_string
+
+    def action_taken(self):
+        """
+        action_taken
+
+        Returns
+        -------
+        action taken: bool
+            True if action has been taken, False if not
+        """
+        return self._action_taken
+
+
+class _HeapEventList:
+    """
+    future event list, implemented as a binary heap
+
+    All event list backends hold [t, priority, seq, component, return_value] entries and
+    provide push, pop, peek, remove, __len__, __bool__ and __iter__ (in arbitrary order).
+    pop and peek may only be called on a non empty event list.
+
+    The entry is also stored as a handle in the component (_event_entry), so removing a component
+    from the event list is just marking the entry as cancelled (component set to None).
+    Cancelled entries are discarded when they reach the top of the heap or, if they make up
+    more than half of the heap, compacted away in one go.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._number_of_cancelled = 0
+
+    def __len__(self):
+        return len(self._heap) - self._number_of_cancelled
+
+    def __bool__(self):
+        return len(self._heap) > self._number_of_cancelled
+
+    def __iter__(self):
+        for entry in self._heap:
+            if entry[3] is not None:
+                yield entry
+
+    def push(self, entry):
+        heapq.heappush(self._heap, entry)
+
+    def pop(self):
+        heap = self._heap
+        entry = heapq.heappop(heap)
+        while entry[3] is None:
+            self._number_of_cancelled -= 1
+            entry = heapq.heappop(heap)
+        return entry
+
+    def peek(self):
+        heap = self._heap
+        while heap[0][3] is None:
+            heapq.heappop(heap)
+            self._number_of_cancelled -= 1
+        return heap[0]
+
+    def remove(self, entry):
+        entry[3] = None
+        self._number_of_cancelled += 1
+        if self._number_of_cancelled > 256 and 2 * self._number_of_cancelled > len(self._heap):
+            self._heap = [entry for entry in self._heap if entry[3] is not None]
+            heapq.heapify(self._heap)
+            self._number_of_cancelled = 0
+
+
+class _CalendarEventList:
+    """
+    future event list, implemented as a calendar queue (R. Brown, 1988)
+
+    The entries are hashed on their time into a circular array of buckets, each of which
+    is kept sorted. Each bucket covers width time units per 'year' of number_of_buckets * width.
+    The number of buckets is doubled/halved when the number of entries grows/shrinks, in which case
+    the width is re-estimated from the separation of the first entries.
+    Enqueueing and dequeueing are O(1) amortized, if the event times are (more or less) evenly spread.
+    """
+
+    def __init__(self):
+        self._length = 0
+        self._current = 0  # virtual bucket number (t // width) of the first entry
+        self._buckets = []
+        self._resize(2, 1.0)
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    def _resize(self, number_of_buckets, width):
+        entries = sorted(entry for bucket in self._buckets for entry in bucket)
+        self._number_of_buckets = number_of_buckets
+        self._width = width
+        self._buckets = [[] for _ in range(number_of_buckets)]
+        for entry in entries:  # entries are sorted, so just appending keeps the buckets sorted
+            self._buckets[int(entry[0] // width) % number_of_buckets].append(entry)
+        if entries:
+            self._current = int(entries[0][0] // width)
+        self._grow_threshold = 2 * number_of_buckets
+        self._shrink_threshold = number_of_buckets // 2 - 2
+
+    def _new_width(self):
+        # based on the average separation of (at most) the 25 first distinct event times, ignoring outliers
+        ts = sorted(set(entry[0] for entry in heapq.nsmallest(25, self)))
+        if len(ts) < 2:
+            return self._width
+        separations = [t1 - t0 for t0, t1 in zip(ts, ts[1:])]
+        average = sum(separations) / len(separations)
+        separations = [separation for separation in separations if separation <= 2 * average]
+        return 3 * sum(separations) / len(separations)
+
+    def _locate(self):
+        # returns the bucket that contains the first entry and makes that the current bucket
+        buckets = self._buckets
+        number_of_buckets = self._number_of_buckets
+        width = self._width
+        current = self._current
+        for current in range(current, current + number_of_buckets):
+            bucket = buckets[current % number_of_buckets]
+            if bucket and bucket[0][0] // width <= current:
+                self._current = current
+                return bucket
+        # nothing found in a full year, so search directly
+        bucket = min((bucket for bucket in buckets if bucket), key=operator.itemgetter(0))
+        self._current = int(bucket[0][0] // width)
+        return bucket
+
+    def push(self, entry):
+        virtual_bucket = int(entry[0] // self._width)
+        if virtual_bucket < self._current:  # might happen after a peek
+            self._current = virtual_bucket
+        bucket = self._buckets[virtual_bucket % self._number_of_buckets]
+        if not bucket or entry > bucket[-1]:
+            bucket.append(entry)
+        else:
+            bisect.insort(bucket, entry)
+        self._length += 1
+        if self._length > self._grow_threshold:
+            self._resize(2 * self._number_of_buckets, self._new_width())
+
+    def pop(self):
+        entry = self._locate().pop(0)
+        self._length -= 1
+        if self._length < self._shrink_threshold:
+            self._resize(self._number_of_buckets // 2, self._new_width())
+        return entry
+
+    def peek(self):
+        return self._locate()[0]
+
+    def remove(self, entry):
+        bucket = self._buckets[int(entry[0] // self._width) % self._number_of_buckets]
+        del bucket[bisect.bisect_left(bucket, entry)]
+        self._length -= 1
+
+
+class _LadderEventList:
+    """
+    future event list, implemented as a ladder queue (W.T. Tang, R.S.M. Goh and I.L.-J. Thng, 2005)
+
+    There are three tiers:
+
+    - top: an unsorted list with all entries at or beyond top_start
+
+    - ladder: a number of rungs, each with buckets of a fixed width.
+      The buckets of a rung cover one bucket of the rung above it (the first rung covers the top,
+      when the top was transferred to the ladder).
+
+    - bottom: a (small) heap of the entries that are to be dequeued first
+
+    Only when the bottom is exhausted, the next non empty bucket of the lowest rung is moved
+    to the bottom, or split into a new rung if it contains too many entries.
+    Enqueueing and dequeueing are O(1) amortized.
+
+    Removing is done by marking the entry as cancelled (component set to None). Cancelled entries
+    are discarded when dequeued or compacted away in one go if they make up more than half of the entries.
+    """
+
+    bucket_threshold = 50
+    maximum_number_of_rungs = 8
+
+    def __init__(self):
+        self._top = []
+        self._top_start = -inf
+        self._top_min = inf
+        self._top_max = -inf
+        self._rungs = []  # each rung is [buckets, start, width, index of current bucket]
+        self._bottom = []
+        self._length = 0
+        self._number_of_cancelled = 0
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        for entry in self._all_entries():
+            if entry[3] is not None:
+                yield entry
+
+    def _all_entries(self):
+        yield from self._top
+        for buckets, _, _, current in self._rungs:
+            for bucket in buckets[current:]:
+                yield from bucket
+        yield from self._bottom
+
+    def push(self, entry):
+        self._length += 1
+        t = entry[0]
+        if t >= self._top_start:
+            self._top.append(entry)
+            if t < self._top_min:
+                self._top_min = t
+            if t > self._top_max:
+                self._top_max = t
+            return
+        for buckets, start, width, current in self._rungs:
+            index = int((t - start) / width)
+            if index >= current:
+                buckets[index if index < len(buckets) else len(buckets) - 1].append(entry)
+                return
+        heapq.heappush(self._bottom, entry)
+
+    def _spawn_rung(self, entries, start, width):
+        number_of_buckets = len(entries)
+        width = width / number_of_buckets
+        buckets = [[] for _ in range(number_of_buckets)]
+        for entry in entries:
+            index = int((entry[0] - start) / width)
+            buckets[index if index < number_of_buckets else number_of_buckets - 1].append(entry)
+        self._rungs.append([buckets, start, width, 0])
+
+    def _fill_bottom(self):
+        while True:
+            while self._rungs:
+                rung = self._rungs[-1]
+                buckets, start, width, current = rung
+                while current < len(buckets) and not buckets[current]:
+                    current += 1
+                if current == len(buckets):
+                    del self._rungs[-1]
+                    continue
+                bucket = buckets[current]
+                buckets[current] = []
+                rung[3] = current + 1
+                bucket_start = start + current * width
+                if len(bucket) > self.bucket_threshold and len(self._rungs) < self.maximum_number_of_rungs and min(bucket)[0] != max(bucket)[0]:
+                    self._spawn_rung(bucket, bucket_start, width)
+                    continue
+                heapq.heapify(bucket)
+                self._bottom = bucket
+                return
+            # ladder is empty, so transfer top to the ladder
+            top = self._top
+            self._top = []
+            start = self._top_min
+            width = self._top_max - self._top_min
+            self._top_min = inf
+            self._top_max = -inf
+            if width == 0:  # all the same time
+                self._top_start = start + 1e-9 * abs(start) if start else 1e-9
+                heapq.heapify(top)
+                self._bottom = top
+                return
+            width = width * (1 + 1 / len(top))  # make sure the maximum is in the last bucket
+            self._top_start = start + width
+            self._spawn_rung(top, start, width)
+
+    def pop(self):
+        while True:
+            if not self._bottom:
+                self._fill_bottom()
+            entry = heapq.heappop(self._bottom)
+            if entry[3] is not None:
+                self._length -= 1
+                return entry
+            self._number_of_cancelled -= 1
+
+    def peek(self):
+        while True:
+            if not self._bottom:
+                self._fill_bottom()
+            entry = self._bottom[0]
+            if entry[3] is not None:
+                return entry
+            heapq.heappop(self._bottom)
+            self._number_of_cancelled -= 1
+
+    def remove(self, entry):
+        entry[3] = None
+        self._length -= 1
+        self._number_of_cancelled += 1
+        if self._number_of_cancelled > 256 and self._number_of_cancelled > self._length:
+            entries = list(self)
+            self.__init__()
+            for entry in entries:
+                self.push(entry)
+
+
+class _TimeoutWheel:
+    """
+    timer wheel for the timeouts (fail_at/fail_delay) of request, wait, wait_for, from_store and to_store,
+    that are usually cancelled long before they expire (think of reneging customers)
+
+    The entries (the same as in the event list) are hashed on their time into buckets of width time units.
+    Arming and disarming a timeout is O(1) (apart from the first entry of a bucket) and cancelled timeouts
+    never reach the event list.
+    Only when the event list arrives at a bucket (flush), the remaining entries of that bucket
+    are moved to the event list.
+    The width is set from the (smoothed) mean timeout duration, whenever the wheel is empty.
+    """
+
+    def __init__(self):
+        self._buckets = {}  # bucket number: {seq: entry}
+        self._numbers = []  # heap of bucket numbers, might contain numbers of already flushed buckets
+        self._width = 1.0
+        self._length = 0
+        self._mean_duration = None
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            yield from bucket.values()
+
+    def push(self, entry, now):
+        """
+        arms a timeout
+
+        returns False if the timeout is due in the current bucket, in which case the entry should be pushed
+        on the event list directly
+        """
+        duration = entry[0] - now
+        if self._mean_duration is None:
+            self._mean_duration = duration
+        else:
+            self._mean_duration += (duration - self._mean_duration) * 0.01
+        if not self._length:
+            self._width = self._mean_duration / 16 if self._mean_duration > 0 else 1.0
+            self._numbers.clear()
+        width = self._width
+        number = entry[0] // width
+        if number <= now // width:
+            return False
+        bucket = self._buckets.get(number)
+        if bucket is None:
+            bucket = self._buckets[number] = {}
+            heapq.heappush(self._numbers, number)
+        bucket[entry[2]] = entry
+        self._length += 1
+        return True
+
+    def remove(self, entry):
+        """
+        disarms a timeout
+
+        returns False if the entry is not (anymore) in the wheel, i.e. it has to be removed from the event list
+        """
+        if not self._length:
+            return False
+        number = entry[0] // self._width
+        bucket = self._buckets.get(number)
+        if bucket is None or bucket.pop(entry[2], None) is None:
+            return False
+        self._length -= 1
+        if not bucket:
+            del self._buckets[number]
+        return True
 
-    def process(self):
-        self.env.print_trace("", "", self._action_string, "")
-        self._action()
-        self._action_taken = True
+    def flush(self, event_list):
+        """
+        moves the bucket(s) with timeouts due before or at the first event of the event list
+        (or the first bucket if the event list is empty) to the event list
 
-    def action(self, value=None):
+        should be called before every pop or peek of the event list if the wheel is not empty
         """
-        action
+        numbers = self._numbers
+        buckets = self._buckets
+        # floor division is monotonic, so an entry not later than the first event is always flushed
+        limit = event_list.peek()[0] // self._width if event_list else None
+        while numbers:
+            number = numbers[0]
+            if limit is not None and number > limit:
+                return
+            heapq.heappop(numbers)
+            bucket = buckets.pop(number, None)
+            if bucket:
+                self._length -= len(bucket)
+                for entry in bucket.values():
+                    event_list.push(entry)
+                limit = number  # all later buckets are later than the entries just pushed
 
-        Parameters
-        ----------
-        value : callable
-            new action callable
 
+class _ScheduledCall:
+    """
+    handle of a call scheduled with Environment.schedule
+
+    This is not a component, but lives on the same event list.
+    """
+
+    __slots__ = ("env", "_func", "_args", "_event_entry", "_scheduled_time")
+
+    def __init__(self, env, func, args):
+        self.env = env
+        self._func = func
+        self._args = args
+        self._event_entry = None
+        self._scheduled_time = inf
+
+    def __repr__(self):
+        return object_to_str(self) + " (" + self.name() + ")"
+
+    def name(self) -> str:
+        """
         Returns
         -------
-        current action : callable
+        name of the scheduled call, derived from the function : str
         """
-        if value is not None:
-            self._action = value
-        return self._action
+        return "call " + getattr(self._func, "__qualname__", repr(self._func))
 
-    def action_string(self, value=None):
+    def cancel(self) -> None:
         """
-        action_string
+        cancels the scheduled call
 
-        Parameters
-        ----------
-        value : string
-            new action_string
+        Note
+        ----
+        If the call has already been executed or cancelled, no action is taken
+        """
+        if self._event_entry is not None:
+            if self.env._trace:
+                self.env.print_trace("", "", self.name() + " cancel")
+            self.env._event_list.remove(self._event_entry)
+            self._event_entry = None
+            self._scheduled_time = inf
 
+    def isscheduled(self) -> bool:
+        """
         Returns
         -------
-        current action_string : string
+        True if the call is still on the event list, False otherwise : bool
         """
+        return self._event_entry is not None
 
-        if value is not None:
-            self._action_string = value
-        return self._action_string
-
-    def action_taken(self):
+    def scheduled_time(self) -> float:
         """
-        action_taken
-
         Returns
         -------
-        action taken: bool
-            True if action has been taken, False if not
+        time the call is scheduled for, if it is scheduled : float
+            returns inf otherwise
         """
-        return self._action_taken
+        return self._scheduled_time - self.env._offset
+
+    def _execute(self):
+        self._event_entry = None
+        self._scheduled_time = inf
+        self._func(*self._args)
+
+
+class _CapacitySchedule:
+    """
+    changes the capacity of a queue, store or resource according to a list of (time, capacity) tuples
+
+    Only the next change is on the event list (as a call, see Environment.schedule), so no component is required.
+    If cycle is given, the schedule is repeated every cycle time units.
+    """
+
+    __slots__ = ("owner", "times", "capacities", "cycle", "index", "offset", "call")
+
+    def __init__(self, owner, capacity_schedule, cycle):
+        env = owner.env
+        self.owner = owner
+        self.times = []
+        self.capacities = []
+        for t, capacity in capacity_schedule:
+            t = env.spec_to_time(t)
+            if self.times and t < self.times[-1]:
+                raise ValueError("times in capacity_schedule are not ascending")
+            self.times.append(t)
+            self.capacities.append(capacity)
+        if cycle is not None:
+            cycle = env.spec_to_duration(cycle)
+            if not self.times or cycle <= self.times[-1] - self.times[0]:
+                raise ValueError(f"cycle ({cycle}) should be greater than the time span of a non empty capacity_schedule")
+        self.cycle = cycle
+        self.index = 0
+        self.offset = 0
+        self.call = None
+
+    def current_capacity(self, capacity):
+        # skips all changes at or before now (in the current cycle, if cycle is given) and returns the capacity of the
+        # last one (or capacity if none)
+        now = self.owner.env.now()
+        if self.cycle is not None and now >= self.times[0]:
+            self.offset = math.floor((now - self.times[0]) / self.cycle) * self.cycle
+        self.index = bisect.bisect_right(self.times, now - self.offset)
+        if self.index:
+            return self.capacities[self.index - 1]
+        return capacity
+
+    def schedule_next(self):
+        if self.index == len(self.times):
+            if self.cycle is None:
+                self.call = None
+                return
+            self.index = 0
+            self.offset += self.cycle
+        self.call = self.owner.env.schedule(self.change, at=self.times[self.index] + self.offset, cap_now=True)
+
+    def change(self):
+        capacity = self.capacities[self.index]
+        self.index += 1
+        self.schedule_next()
+        self.owner.set_capacity(capacity)
+
+    def cancel(self):
+        if self.call is not None:
+            self.call.cancel()
+            self.call = None
+
+    @classmethod
+    def replace(cls, owner, capacity_schedule, cycle):
+        # cancels the capacity schedule of owner (if any) and starts capacity_schedule (if not None)
+        if owner._capacity_schedule is not None:
+            owner._capacity_schedule.cancel()
+            owner._capacity_schedule = None
+        if capacity_schedule is not None:
+            owner._capacity_schedule = cls(owner, capacity_schedule, cycle)
+            capacity = owner._capacity_schedule.current_capacity(None)
+            if capacity is not None:
+                owner.set_capacity(capacity)
+            owner._capacity_schedule.schedule_next()
+
+
+_event_list_backends = {"heap": _HeapEventList, "calendar": _CalendarEventList, "ladder": _LadderEventList}
 
 
 class Environment:
@@ -10480,6 +12254,26 @@ class Environment:
         This is particularly useful when running a simulation on a server.
         Note that this will show a slight performance increase, when creating videos.
 
+    event_list : str
+        data structure used for the future event list
+
+        if "heap" (default), a binary heap is used. This is a good choice for most models.
+
+        if "calendar", a calendar queue is used
+
+        if "ladder", a ladder queue is used
+
+        Calendar and ladder queues have O(1) amortized enqueue and dequeue, which may be faster
+        for models with a very large number of (more or less evenly spread) future events.
+        The order in which components become current is the same for all event lists.
+
+    component_monitors : bool
+        if True (default), each component has a status and a mode monitor (level monitors)
+
+        if False, the status and mode of a component only hold the current value, so
+        c.status() and c.mode() are still available, but no statistics nor histograms.
+        This saves memory and time when creating many (short lived) components.
+
     Any valid parameter for Environment.animation_parameters() will be forwarded to animation_parameters(), e.g.
         env = sim.Environment(trace=True, animation=True, speed=5)
 
@@ -10508,6 +12302,8 @@ class Environment:
         do_reset: bool = None,
         blind_animation: bool = None,
         yieldless: bool = None,
+        event_list: str = "heap",
+        component_monitors: bool = True,
         **kwargs,
     ):
         _check_overlapping_parameters(self, "__init__", "setup")
@@ -10533,6 +12329,7 @@ class Environment:
             self.isfrozen = True
             return
         self._ui = False
+        self._run_fast = False
         self._step_n = 0
         self._ui_granularity = 1
 
@@ -10552,6 +12349,7 @@ class Environment:
                 self.print_trace_header()
             self.print_trace("", "", self.name() + " initialize")
         self.env = self
+        self._component_monitors = component_monitors
         # just to allow main to be created; will be reset later
         self._nameserializeComponent = {}
         self._now = 0
@@ -10569,9 +12367,16 @@ class Environment:
         self._nameserializeStore = {}
         self._nameserializeState = {}
         self._seq = 0
-        self._event_list = []
+        try:
+            self._event_list = _event_list_backends[event_list]()
+        except KeyError:
+            raise ValueError(f"event_list {event_list!r} not recognized. Should be one of {', '.join(map(repr, _event_list_backends))}") from None
+        self._timeouts = _TimeoutWheel()  # the timeouts of request, wait, etc. that are not yet due
         self._standbylist = []
         self._pendingstandbylist = []
+        self._state_reads = None  # while evaluating a wait_for condition without states: {state: None} of the states read
+        self._pending_conditions = {}  # {component: None} of wait_for conditions without states to be evaluated
+        self._state_batch = None  # within batch_state_updates: {state: None} of the states that changed
 
         self.an_objects = set()
         self.an_objects_over3d = set()
@@ -11189,8 +12994,10 @@ class Environment:
                 self._pendingstandbylist = list(self.env._standbylist)
                 self.env._standbylist = []
 
+            if self._timeouts:
+                self._timeouts.flush(self._event_list)
             if self._event_list:
-                (t, priority, seq, c, return_value) = heapq.heappop(self._event_list)
+                (t, priority, seq, c, return_value) = self._event_list.pop()
             else:
                 t = inf  # only events with t==inf left, so signal that we have ended
             if t == inf:
@@ -11200,9 +13007,16 @@ class Environment:
                     self.print_trace("", "", "run ended", "no events left", s0=un_na(c.lineno_txt()))
                 else:
                     t = inf
-            c._on_event_list = False
+            c._event_entry = None
             self.env._now = t
 
+            if c.__class__ is _ScheduledCall:
+                self._current_component = self._main
+                if self._trace:
+                    self.print_trace(self.time_to_str(self._now - self._offset), c.name(), "current")
+                c._execute()
+                return
+
             self._current_component = c
 
             c.status._value = current
@@ -11285,7 +13099,7 @@ class Environment:
 
     def _print_event_list(self, s: str = "") -> None:
         print("eventlist ", s)
-        for t, priority, sequence, comp, return_value in self._event_list:
+        for t, priority, sequence, comp, return_value in itertools.chain(self._event_list, self._timeouts):
             print("    ", self.time_to_str(t), comp.name(), "priority", priority, "return_value", return_value)
 
     def on_closing(self):
@@ -11795,6 +13609,7 @@ class Environment:
             if animate != self._animate:
                 frame_changed = True
                 self._animate = animate
+                self._run_fast = False
                 if self._ui and "-ANIMATE-" in self._ui_keys:
                     self._ui_window["-ANIMATE-"].update(animate)
 
@@ -11906,6 +13721,7 @@ class Environment:
         if frame_changed:
             if g.animation_env is not None:
                 g.animation_env._animate = self._animate
+                g.animation_env._run_fast = False
                 if not Pythonista:
                     if g.animation_env.root is not None:  # for blind animation to work properly
                         if self._ui:
@@ -13104,14 +14920,127 @@ class Environment:
         if len(self.env._pendingstandbylist) > 0:
             return self.env._now
         else:
+            if self._timeouts:
+                self._timeouts.flush(self._event_list)
             if self._event_list:
-                return self._event_list[0][0]
+                return self._event_list.peek()[0]
             else:
                 if self.end_on_empty_eventlist:
                     return self._now
                 else:
                     return inf
 
+    def schedule(
+        self,
+        func: Callable,
+        *args: Any,
+        at: Union[float, Callable] = None,
+        delay: Union[float, Callable] = None,
+        priority: float = 0,
+        urgent: bool = False,
+        cap_now: bool = None,
+    ) -> "_ScheduledCall":
+        """
+        schedule a call of func(*args), without creating a component
+
+        Parameters
+        ----------
+        func : callable
+            function to be called
+
+        args : any
+            positional arguments for func
+
+        at : float or distribution
+            time at which func will be called
+
+            if omitted, now is used
+
+            if distribution, the distribution is sampled
+
+        delay : float or distribution
+            call with a delay
+
+            if omitted, no delay
+
+            if distribution, the distribution is sampled
+
+        priority : float
+            priority
+
+            default: 0
+
+            if a component or call has the same time on the event list, this call is sorted accoring to
+            the priority.
+
+        urgent : bool
+            urgency indicator
+
+            if False (default), the call will be scheduled
+            behind all other components and calls scheduled
+            for the same time and priority
+
+            if True, the call will be scheduled
+            in front of all components and calls scheduled
+            for the same time and priority
+
+        cap_now : bool
+            indicator whether times (at, delay) in the past are allowed. If, so now() will be used.
+            default: sys.default_cap_now(), usualy False
+
+        Returns
+        -------
+        handle of the scheduled call, that can be used to cancel it : _ScheduledCall
+
+        Note
+        ----
+        This is much cheaper than creating a component, for timer-like logic, like
+        sampling a sensor or changing a shift.
+
+        func is called outside of any process, so it should not hold, passivate, request, wait, etc.
+        It may, however, activate other components, set states, tally monitors, etc.
+
+        if both at and delay are specified, the call will take place at the sum of these two.
+        """
+        if delay is None:
+            delay = 0.0
+        else:
+            delay = self.spec_to_duration(delay)
+        if at is None:
+            scheduled_time = self._now + delay
+        else:
+            scheduled_time = self.spec_to_time(at) + self._offset + delay
+        if scheduled_time < self._now:
+            if cap_now is None:
+                cap_now = g._default_cap_now
+            if cap_now:
+                scheduled_time = self._now
+            else:
+                raise ValueError(f"scheduled time ({scheduled_time:0.3f}) before now ({self._now:0.3f})")
+
+        scheduled_call = _ScheduledCall(self, func, args)
+        if self._trace:
+            delta = "" if scheduled_time in (self._now, inf) else f" +{self.duration_to_str(scheduled_time - self._now)}"
+            self.print_trace(
+                "",
+                "",
+                scheduled_call.name() + " schedule" + delta,
+                merge_blanks("scheduled for " + self.time_to_str(scheduled_time - self._offset).strip() + _prioritytxt(priority) + _urgenttxt(urgent)),
+            )
+        if scheduled_time != inf:
+            self._seq += 1
+            scheduled_call._scheduled_time = scheduled_time
+            scheduled_call._event_entry = [scheduled_time, priority, -self._seq if urgent else self._seq, scheduled_call, None]
+            self._event_list.push(scheduled_call._event_entry)
+        return scheduled_call
+
+    def _evaluate_pending_conditions(self):
+        pending_conditions = self._pending_conditions
+        self._pending_conditions = {}
+        for c in pending_conditions:
+            if c._cond_tracked and c._waits:  # still waiting for a condition without states
+                c._trywait()
+
     def main(self) -> "Component":
         """
         Returns
@@ -13197,10 +15126,57 @@ class Environment:
         if value is not None:
             self._trace = value
             self._buffered_trace = False
+            if value:
+                self._run_fast = False
             if self._ui:
                 self._ui_window["-TRACE-"].update(value)
         return self._trace
 
+    @contextlib.contextmanager
+    def batch_state_updates(self):
+        """
+        context manager to set several states, before any waiting component is checked
+
+        Within the batch, setting (or resetting) a state doesn't check the waiting components.
+        At the end of the batch, each component that waits for any of the changed states is checked just once,
+        with the final values of all states. So, components won't be honored on intermediate values.
+
+        Note
+        ----
+        To be used as ::
+
+            with env.batch_state_updates():
+                light_north.set("red")
+                light_east.set("green")
+
+        Batches may be nested. Only at the end of the outermost batch the waiting components are checked.
+        That's also the case if the batch is left with an exception.
+
+        Do not hold, wait, request, etc. within a batch.
+
+        State.trigger() is not deferred, as the triggered value is just temporary.
+        """
+        if self._state_batch is not None:
+            yield
+            return
+        self._state_batch = {}
+        try:
+            yield
+        finally:
+            # also if the batch is left with an exception, as the states have changed anyway
+            states = self._state_batch
+            self._state_batch = None
+            waiters = {}  # each waiter is checked only once
+            for state in states:
+                for c in state._waiters_to_check():
+                    waiters[c] = None
+            for c in waiters:
+                if c._waits:  # still waiting
+                    if c._cond_tracked:
+                        c._pend_condition()
+                    else:
+                        c._trywait()
+
     @contextlib.contextmanager
     def suppress_trace(self):
         """
@@ -13419,9 +15395,68 @@ class Environment:
         else:
             while g.in_draw:
                 pass
+            if self.running and not (self._trace or self._ui or self._animate or self._standbylist or self._pendingstandbylist or PyPy):
+                self._fast_step_loop()
             while self.running and not self._animate:
                 self.step()
 
+    def _fast_step_loop(self):
+        """
+        executes steps of the future event list, like step, but without any checks for trace, ui,
+        animation and standby components.
+
+        The loop ends when main becomes current, when there are no more events, or as soon as
+        trace, ui, animation or standby is switched on. Then the simulation should be continued with step.
+
+        Only for internal use by run (trace, ui and animation must be off and there may be no standby components)
+        """
+        self._run_fast = True
+        event_list = self._event_list
+        pop = event_list.pop
+        timeouts = self._timeouts
+        main = self._main
+        yieldless = self._yieldless
+        terminate = self._terminate
+        while self._run_fast:
+            if timeouts:
+                timeouts.flush(event_list)
+            if not event_list:
+                break
+            t, priority, seq, c, return_value = pop()
+            self._now = t
+            if c.__class__ is _ScheduledCall:
+                self._current_component = main
+                c._execute()
+                continue
+            c._event_entry = None
+            self._current_component = c
+            c.status._value = current
+            c._scheduled_time = inf
+            if c is main:
+                self.running = False
+                return
+            c._check_fail()
+            if yieldless:
+                glet = c._glet
+                glet.switch()
+                if glet.dead:
+                    terminate(c)
+            elif c._process_isgenerator:
+                try:
+                    try:
+                        c._process.send(return_value)
+                    except TypeError as e:
+                        if "just-started" in str(e):  # only do this for just started generators
+                            c._process.send(None)
+                        else:
+                            raise e
+                except StopIteration:
+                    terminate(c)
+            else:
+                c._process(**c._process_kwargs)
+                terminate(c)
+        self._run_fast = False
+
     def do_simulate_and_animate(self):
         self._x0z = self._x0
         self._y0z = self._y0
@@ -15089,6 +17124,7 @@ class Environment:
         self.animation_parameters(use_toplevel=True)
         self.pauser = _Pauser(at=inf)
         self._ui = True
+        self._run_fast = False
         if actions is None:
             actions = []
         if user_handle_event is None:
@@ -15363,7 +17399,7 @@ class Animate2dBase(DynamicClass):
         if attached_to is None and parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
 
         screen_coordinates = locals_["screen_coordinates"]
         over3d = locals_["over3d"]
@@ -16518,7 +18554,7 @@ class Animate:
         if parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
         self.keep0 = keep
         self.visible0 = visible
         self.screen_coordinates = screen_coordinates
@@ -18266,7 +20302,7 @@ class AnimateQueue(DynamicClass):
         if parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
         self.env = queue.env
 
         self.titleoffsetx = titleoffsetx
@@ -18556,7 +20592,7 @@ class Animate3dQueue(DynamicClass):
         if parent is not None:
             if not isinstance(parent, Component):
                 raise ValueError(repr(parent) + " is not a component")
-            parent._animation_children.add(self)
+            parent._add_animation_child(self)
         self.env = queue.env
         self.layer = layer
         self.register_dynamic_attributes("x y z id max_length direction reverse layer visible keep")
@@ -20789,14 +22825,14 @@ class _BlindVideoMaker(Component):
     def process_yielded(self):
         while True:
             self.handle()
-            if not self.env._event_list:
+            if not (self.env._event_list or self.env._timeouts):
                 break  # we've finished
             yield self.hold(self.env._speed / self.env._fps)
 
     def process_yieldless(self):
         while True:
             self.handle()
-            if not self.env._event_list:
+            if not (self.env._event_list or self.env._timeouts):
                 break  # we've finished
             self.hold(self.env._speed / self.env._fps)
 
@@ -23486,6 +25522,63 @@ class Distribution(_Distribution):
         return self._mean
 
 
+class _ComponentsInOrder:
+    """
+    components in the order of a queue, like the requesters of a resource that request the same quantity
+    or the waiters of a state that wait for the same value
+
+    keys is an ascending list of (priority, sequence) tuples, that may contain keys of components
+    that are not in the collection anymore. These are skipped and removed when there are too many of them.
+    """
+
+    __slots__ = ("components", "by_key", "keys")
+
+    def __init__(self):
+        self.components = {}  # component: key
+        self.by_key = {}  # key: component
+        self.keys = []
+
+    def add(self, component, key):
+        self.components[component] = key
+        self.by_key[key] = component
+        bisect.insort(self.keys, key)
+
+    def remove(self, component):
+        del self.by_key[self.components.pop(component)]
+        if len(self.keys) > 2 * len(self.components) + 16:
+            self.keys = [key for key in self.keys if key in self.by_key]
+
+    def next_key(self, key=None):
+        # returns the first key > key (if given) of a component that is still in the collection, None if none
+        # the keys of removed components that are skipped are deleted, so they are not scanned again
+        keys = self.keys
+        by_key = self.by_key
+        start = i = 0 if key is None else bisect.bisect_right(keys, key)
+        n = len(keys)
+        while i < n and keys[i] not in by_key:
+            i += 1
+        if i > start:
+            del keys[start:i]
+        return keys[start] if start < len(keys) else None
+
+
+class _WaitExpression(str):
+    """
+    a wait value containing $-signs (see Component.wait)
+
+    This is just the given string, but with the condition compiled into a function condition(self, state), where self
+    is the component under test and state is the state under test.
+    The most recently used expressions are cached, so these are compiled only once.
+    """
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def __new__(cls, source):
+        wait_expression = str.__new__(cls, source)
+        wait_expression.condition = eval("lambda self, state: " + source.replace("$", "state._value"))
+        return wait_expression
+
+
 class State:
     """
     State
@@ -23549,6 +25642,11 @@ class State:
         with self.env.suppress_trace():
             self._waiters = Queue(name="waiters of " + self.name(), monitor=monitor, env=self.env)
             self._waiters._isinternal = True
+            self._waiters._owner = self  # used by Component.priority()
+        self._waiters_by_value = {}  # value: _ComponentsInOrder, for waiters that can only be honored if the state gets that value
+        self._other_waiters = _ComponentsInOrder()  # waiters that have to be checked on every change
+        self._waiter_values = {}  # waiter: tuple of the values it is indexed on (empty if in _other_waiters)
+        self._waiter_sequence = 0  # to keep the order of waiters with the same priority
         self.value = _StateMonitor(parent=self, name="Value of " + self.name(), level=True, initial_tally=value, monitor=monitor, type=type, env=self.env)
         if self.env._trace:
             self.env.print_trace("", "", self.name() + " create", "value = " + repr(self._value))
@@ -23687,6 +25785,8 @@ class State:
         return return_or_print(result, as_str, file)
 
     def __call__(self):
+        if self.env._state_reads is not None:
+            self.env._state_reads[self] = None
         return self._value
 
     def get(self) -> Any:
@@ -23708,6 +25808,8 @@ class State:
             print(level.get())  # identical
 
         """
+        if self.env._state_reads is not None:
+            self.env._state_reads[self] = None
         return self._value
 
     def set(self, value: Any = True):
@@ -23731,7 +25833,10 @@ class State:
         if self._value != value:
             self._value = value
             self.value.tally(value)
-            self._trywait()
+            if self.env._state_batch is None:
+                self._trywait()
+            else:
+                self.env._state_batch[self] = None
 
     def reset(self, value: Any = False):
         """
@@ -23754,7 +25859,10 @@ class State:
         if self._value != value:
             self._value = value
             self.value.tally(value)
-            self._trywait()
+            if self.env._state_batch is None:
+                self._trywait()
+            else:
+                self.env._state_batch[self] = None
 
     def trigger(self, value: Any = True, value_after: Any = None, max: Union[float, int] = inf):
         """
@@ -23795,15 +25903,81 @@ class State:
         self._trywait()
 
     def _trywait(self, max=inf):  # this _trywait of a state
-        mx = self._waiters._head.successor
-        while mx != self._waiters._tail:
-            c = mx.component
-            mx = mx.successor
-            if c._trywait():
+        for c in self._waiters_to_check():
+            if c._cond_tracked:
+                c._pend_condition()
+            elif c._trywait():
                 max -= 1
                 if max == 0:
                     return
 
+    def _waiters_to_check(self):
+        # Yields only the waiters that wait for the current value and the waiters that have to be checked on
+        # every change, in the order of the waiters queue.
+        # Checking a waiter can only remove it (if honored), so the keys can be taken in advance.
+        other_waiters = self._other_waiters
+        try:
+            group = self._waiters_by_value.get(self._value)
+        except TypeError:  # unhashable value, so not waited for by any indexed waiter
+            group = None
+        if group is None:
+            keys = other_waiters.keys[:]
+        else:
+            keys = heapq.merge(other_waiters.keys[:], group.keys[:])
+        for key in keys:
+            c = other_waiters.by_key.get(key)
+            if c is None and group is not None:
+                c = group.by_key.get(key)
+            if c is not None:
+                yield c
+
+    def _index_values(self, c):
+        # Returns the values of this state that c waits for, if c can only be honored when this state has one of
+        # these values. Returns () if c has to be checked on every change.
+        # Note that the other waits of a waiting component (without all) are not met, as it would have been honored
+        # otherwise. Only the (constant) values can be trusted to remain not met, though.
+        if c._cond:
+            return ()
+        values = [value for state, value, valuetype in c._waits if state is self and valuetype == 0]
+        if not values:
+            return ()
+        if c._wait_all:
+            values = values[:1]  # all values have to be met, so certainly this one
+        elif any(valuetype != 0 for _, _, valuetype in c._waits):
+            return ()
+        try:
+            return tuple(dict.fromkeys(values))
+        except TypeError:  # unhashable value
+            return ()
+
+    def _add_waiter(self, c):
+        # should be called after c has entered the waiters (with all its waits in c._waits)
+        self._waiter_sequence += 1
+        key = (c._qmembers[self._waiters].priority, self._waiter_sequence)
+        values = self._waiter_values[c] = self._index_values(c)
+        for value in values:
+            group = self._waiters_by_value.get(value)
+            if group is None:
+                group = self._waiters_by_value[value] = _ComponentsInOrder()
+            group.add(c, key)
+        if not values:
+            self._other_waiters.add(c, key)
+
+    def _remove_waiter(self, c):
+        values = self._waiter_values.pop(c)
+        for value in values:
+            group = self._waiters_by_value[value]
+            group.remove(c)
+            if not group.components:
+                del self._waiters_by_value[value]
+        if not values:
+            self._other_waiters.remove(c)
+
+    def _rekey_member(self, c):
+        # should be called after the priority of c in the waiters has changed
+        self._remove_waiter(c)
+        self._add_waiter(c)
+
     def monitor(self, value: bool = None) -> None:
         """
         enables/disables the state monitors and value monitor
@@ -23835,7 +26009,7 @@ class State:
         """
         return (self.waiters().length, self.waiters().length_of_stay, self.value)
 
-    def reset_monitors(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset_monitors(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None) -> None:
         """
         resets the monitor for the state's value and the monitors of the waiters queue
 
@@ -23854,9 +26028,14 @@ class State:
             if False, full functionality
 
             if omittted, no change of stats_only
+
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if omitted, no change of percentile_error
         """
-        self._waiters.reset_monitors(monitor=monitor, stats_only=stats_only)
-        self.value.reset(monitor=monitor, stats_only=stats_only)
+        self._waiters.reset_monitors(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
+        self.value.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
     def _get_value(self):
         return self._value
@@ -23968,6 +26147,19 @@ class Resource:
 
         if omitted, 1
 
+    capacity_schedule : iterable of (time, capacity) tuples
+        if given, the capacity will be set to capacity at the given time (so without the need for a component).
+        The times should be ascending. Changes at or before now are applied immediately
+        (overriding capacity).
+
+        if omitted, the capacity is only changed with set_capacity
+
+    capacity_schedule_cycle : float
+        if given, capacity_schedule is repeated every capacity_schedule_cycle time units,
+        e.g. 7 * 24 for a weekly roster in hours. Should be greater than the time span of capacity_schedule.
+
+        if omitted, capacity_schedule is applied just once
+
     initial_claimed_quantity : float
         initial claimed quantity. Only allowed to be non zero for anonymous resources
 
@@ -24015,6 +26207,8 @@ class Resource:
         honor_only_highest_priority: bool = False,
         monitor: bool = True,
         env: "Environment" = None,
+        capacity_schedule: Iterable = None,
+        capacity_schedule_cycle: float = None,
         **kwargs,
     ):
         self.env = _set_env(env)
@@ -24024,6 +26218,12 @@ class Resource:
             if not anonymous:
                 raise ValueError("initial_claimed_quantity != 0 only allowed for anonymous resources")
 
+        if capacity_schedule is None:
+            self._capacity_schedule = None
+        else:
+            self._capacity_schedule = _CapacitySchedule(self, capacity_schedule, capacity_schedule_cycle)
+            capacity = self._capacity_schedule.current_capacity(capacity)
+
         self._capacity = capacity
         self._honor_only_first = honor_only_first
         self._honor_only_highest_priority = honor_only_highest_priority
@@ -24032,6 +26232,7 @@ class Resource:
         with self.env.suppress_trace():
             self._requesters = Queue(name="requesters of " + self.name(), monitor=monitor, env=self.env)
             self._requesters._isinternal = True
+            self._requesters._owner = self  # used by Component.priority()
             self._claimers = Queue(name="claimers of " + self.name(), monitor=monitor, env=self.env)
             self._claimers._isinternal = True
             self._claimers._isclaimers = True  # used by Component.isbumped()
@@ -24039,7 +26240,12 @@ class Resource:
         self._claimed_quantity = initial_claimed_quantity
         self._anonymous = anonymous
         self._preemptive = preemptive
-        self._minq = inf
+        self._requested_quantities = []  # sorted distinct quantities requested by the requesters (except oneof and requests that watch another resource)
+        self._requesters_by_quantity = {}  # quantity: _ComponentsInOrder
+        self._requester_keys = {}  # requester: (priority, sequence), for all requesters, except oneof
+        self._requester_sequence = 0  # to keep the order of requesters with the same priority in _requesters_by_quantity
+        self._number_of_oneof_requesters = 0  # these are not in _requested_quantities
+        self._watched_requesters = {}  # requesters for several resources that only this resource watches: None
         self._trying = False
 
         self.capacity = _CapacityMonitor("Capacity of " + self.name(), level=True, initial_tally=capacity, monitor=monitor, type="float", env=self.env)
@@ -24054,6 +26260,8 @@ class Resource:
         self.occupancy = _SystemMonitor("Occupancy of " + self.name(), level=True, initial_tally=0, monitor=monitor, type="float", env=self.env)
         if self.env._trace:
             self.env.print_trace("", "", self.name() + " create", "capacity=" + str(self._capacity) + (" anonymous" if self._anonymous else ""))
+        if self._capacity_schedule is not None:
+            self._capacity_schedule.schedule_next()
         self.setup(**kwargs)
 
     def ispreemptive(self) -> bool:
@@ -24094,7 +26302,7 @@ class Resource:
             self.occupancy,
         )
 
-    def reset_monitors(self, monitor: bool = None, stats_only: bool = None) -> None:
+    def reset_monitors(self, monitor: bool = None, stats_only: bool = None, percentile_error: float = None) -> None:
         """
         resets the resource monitors
 
@@ -24114,6 +26322,11 @@ class Resource:
 
             if omittted, no change of stats_only
 
+        percentile_error : float
+            relative error of percentiles, median and histograms of stats_only monitors (see Monitor)
+
+            if omitted, no change of percentile_error
+
         Note
         ----
             it is possible to reset individual monitoring with
@@ -24125,10 +26338,10 @@ class Resource:
             occupancy.reset()
         """
 
-        self.requesters().reset_monitors(monitor=monitor, stats_only=stats_only)
-        self.claimers().reset_monitors(monitor=monitor, stats_only=stats_only)
+        self.requesters().reset_monitors(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
+        self.claimers().reset_monitors(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
         for m in (self.capacity, self.available_quantity, self.claimed_quantity, self.occupancy):
-            m.reset(monitor=monitor, stats_only=stats_only)
+            m.reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
     def print_statistics(self, as_str: bool = False, file: TextIO = None) -> str:
         """
@@ -24317,25 +26530,157 @@ class Resource:
                     result.append("    " + pad(c.name(), 20) + " quantity=" + str(c._claims[self]))
         return return_or_print(result, as_str, file)
 
+    def _add_requester(self, c):
+        # should be called after c has entered the requesters (with its request in c._requests)
+        if c.oneof_request:
+            self._number_of_oneof_requesters += 1
+            return
+        self._requester_sequence += 1
+        self._requester_keys[c] = (c._qmembers[self._requesters].priority, self._requester_sequence)
+        if c._watched_resource is None or c._watched_resource is self:
+            self._watch(c)
+            if c._watched_resource is self:
+                self._watched_requesters[c] = None
+
+    def _remove_requester(self, c):
+        # should be called before c._requests is cleared
+        if c.oneof_request:
+            self._number_of_oneof_requesters -= 1
+            return
+        del self._requester_keys[c]
+        if c._watched_resource is None or c._watched_resource is self:
+            self._unwatch(c)
+            if c._watched_resource is self:
+                del self._watched_requesters[c]
+
+    def _rekey_member(self, c):
+        # should be called after the priority of c in the requesters has changed
+        if c.oneof_request:
+            return
+        watched = c._watched_resource is None or c._watched_resource is self
+        if watched:
+            self._unwatch(c)
+        self._requester_sequence += 1
+        self._requester_keys[c] = (c._qmembers[self._requesters].priority, self._requester_sequence)
+        if watched:
+            self._watch(c)
+
+    def _watch(self, c):
+        # adds c to the requesters per quantity, so it will be visited by _tryrequest
+        q = c._requests[self]
+        group = self._requesters_by_quantity.get(q)
+        if group is None:
+            group = self._requesters_by_quantity[q] = _ComponentsInOrder()
+            bisect.insort(self._requested_quantities, q)
+        group.add(c, self._requester_keys[c])
+
+    def _unwatch(self, c):
+        q = c._requests[self]
+        group = self._requesters_by_quantity[q]
+        group.remove(c)
+        if not group.components:
+            del self._requesters_by_quantity[q]
+            del self._requested_quantities[bisect.bisect_left(self._requested_quantities, q)]
+
+    def _rewatch(self):
+        # The requesters that only this resource watches, might now be blocked by another resource or by none at all.
+        # Should be called before any requesters are visited.
+        for c in [c for c in self._watched_requesters if not self._cannot_honor(c)]:
+            c._watch_blocking_resource()
+
+    def _cannot_honor(self, c):
+        # True if the request of c can't be honored because of the quantity requested from self.
+        # Requests with oneof can't be judged on just one resource, so these are never excluded.
+        if c.oneof_request:
+            return False
+        q = c._requests[self]
+        if q > 0:
+            return q > self._capacity - self._claimed_quantity + 1e-8
+        return -q > self._claimed_quantity + 1e-8
+
+    @staticmethod
+    def _restart_required(requests):
+        # The requesters before c failed before and honoring c (with requests) made that only worse, unless
+        # c put something, c got something from a resource where puts are waiting (that might be
+        # possible now) or a resource might now honor another first.
+        # Only then, it is necessary to start again.
+        return any(
+            q < 0
+            or r._honor_only_first
+            or r._honor_only_highest_priority
+            or r._number_of_oneof_requesters
+            or (r._requested_quantities and r._requested_quantities[0] < 0)
+            for r, q in requests.items()
+        )
+
+    def _tryrequest_indexed(self):
+        # Visits only the requesters that request a quantity that is available, in the order of the requesters queue,
+        # by merging the groups of requesters per quantity.
+        # Only possible if all requesters request a positive quantity, without oneof, and without honor_only_first or
+        # honor_only_highest_priority.
+        groups = self._requesters_by_quantity
+        quantities = self._requested_quantities
+        restart = True
+        while restart:
+            restart = False
+            heap = []
+            for q in quantities[: bisect.bisect_right(quantities, self._capacity - self._claimed_quantity + 1e-8)]:
+                group = groups[q]
+                heap.append((group.next_key(), q, group))
+            heapq.heapify(heap)
+            while heap:
+                key, q, group = heapq.heappop(heap)
+                if q > self._capacity - self._claimed_quantity + 1e-8:
+                    continue  # no requester in this group can be honored anymore
+                c = group.by_key.get(key)
+                if c is not None:
+                    requests = c._requests
+                    if c._tryrequest() and self._anonymous and self._restart_required(requests):
+                        restart = True
+                        break
+                key = group.next_key(key)
+                if key is not None:
+                    heapq.heappush(heap, (key, q, group))
+
     def _tryrequest(self):
         # this is Resource._tryrequest
-        if self._anonymous:
-            if not self._trying:
-                self._trying = True
-                mx = mx_first = self._requesters._head.successor
-                mx_first_priority = mx_first.priority
-                while mx != self._requesters._tail:
-                    if self._honor_only_first and mx != mx_first:
-                        break
-                    if self._honor_only_highest_priority and mx.priority != mx_first_priority:
-                        break
-                    c = mx.component
-                    mx = mx.successor
-                    c._tryrequest()
-                    if c not in self._requesters:
+        # Requesters that can't be honored because of the quantity requested from this resource are skipped, without
+        # checking the other resources of their request.
+        # As soon as the smallest requested quantity exceeds the available quantity, no more requests can be honored,
+        # unless there are oneof requesters, as these might be honored by another resource.
+        if self._anonymous and self._trying:
+            return
+        if not self._requested_quantities and not self._number_of_oneof_requesters:
+            return
+        if not (self._honor_only_first or self._honor_only_highest_priority or self._number_of_oneof_requesters or self._requested_quantities[0] < 0):
+            self._trying = True
+            self._tryrequest_indexed()
+            self._trying = False
+        elif self._anonymous:
+            self._trying = True
+            mx = mx_first = self._requesters._head.successor
+            mx_first_priority = mx_first.priority
+            while mx != self._requesters._tail:
+                if self._honor_only_first and mx != mx_first:
+                    break
+                if self._honor_only_highest_priority and mx.priority != mx_first_priority:
+                    break
+                if self._number_of_oneof_requesters == 0:
+                    if not self._requested_quantities:
+                        break  # the remaining requesters are blocked by another resource
+                    minq = self._requested_quantities[0]
+                    if minq > 0 and minq > (self._capacity - self._claimed_quantity + 1e-8):
+                        break  # impossible to honor any more requests
+                c = mx.component
+                mx = mx.successor
+                if self._cannot_honor(c):
+                    continue
+                requests = c._requests
+                if c._tryrequest():
+                    if (mx is not self._requesters._tail and mx.component is None) or self._restart_required(requests):
                         mx = self._requesters._head.successor  # start again
 
-                self._trying = False
+            self._trying = False
         else:
             mx = mx_first = self._requesters._head.successor
             mx_first_priority = mx_first.priority
@@ -24345,11 +26690,16 @@ class Resource:
                     break
                 if self._honor_only_highest_priority and mx.priority != mx_first_priority:
                     break
-                if self._minq > (self._capacity - self._claimed_quantity + 1e-8):
-                    break  # inpossible to honor any more requests
+                if self._number_of_oneof_requesters == 0 and (
+                    not self._requested_quantities or self._requested_quantities[0] > (self._capacity - self._claimed_quantity + 1e-8)
+                ):
+                    break  # impossible to honor any more requests (the remaining requesters might be blocked by another resource)
                 c = mx.component
                 mx = mx.successor
-                c._tryrequest()
+                if self._cannot_honor(c):
+                    continue
+                if c._tryrequest() and mx is not self._requesters._tail and mx.component is None:  # successor has been honored as well (via an anonymous resource)
+                    mx = self._requesters._head.successor
 
     def release(self, quantity: float = None) -> None:
         """
@@ -24428,6 +26778,25 @@ class Resource:
         self.occupancy.tally(0 if self._capacity <= 0 else self._claimed_quantity / self._capacity)
         self._tryrequest()
 
+    def set_capacity_schedule(self, capacity_schedule: Iterable = None, cycle: float = None) -> None:
+        """
+        sets or cancels the capacity schedule
+
+        Parameters
+        ----------
+        capacity_schedule : iterable of (time, capacity) tuples
+            the capacity will be set to capacity at the given time. The times should be ascending.
+            Changes at or before now are applied immediately.
+
+            if omitted, the current capacity schedule (if any) is cancelled
+
+        cycle : float
+            if given, capacity_schedule is repeated every cycle time units
+
+            if omitted, capacity_schedule is applied just once
+        """
+        _CapacitySchedule.replace(self, capacity_schedule, cycle)
+
     def name(self, value: str = None) -> str:
         """
         Parameters
@@ -24527,13 +26896,13 @@ class PeriodMonitor:
         self.org_tally(x, weight)
 
     @staticmethod
-    def new_reset(self, monitor=None, stats_only=None):
+    def new_reset(self, monitor=None, stats_only=None, percentile_error=None):
         for m in self.period_monitors:
             for iperiod in range(len(m.periods)):
-                m.perperiod[iperiod].reset(stats_only=stats_only)
+                m.perperiod[iperiod].reset(stats_only=stats_only, percentile_error=percentile_error)
                 # the individual monitors do not follow the monitor flag
 
-        self.org_reset(monitor=monitor, stats_only=stats_only)
+        self.org_reset(monitor=monitor, stats_only=stats_only, percentile_error=percentile_error)
 
     def __getitem__(self, i):
         return self.perperiod[i]
@@ -25268,6 +27637,25 @@ def type_to_typecode_off(type):
     return lookup[type]
 
 
+def _numpy_frombuffer(a, dtype):
+    # numpy array with the contents of array.array a, normally a zero-copy view on its buffer.
+    # Under PyPy, such a view is freed late, so a might not be able to grow (BufferError) on the next tally.
+    # Therefore, a copy is made there.
+    if PyPy:
+        return numpy.array(a, dtype=dtype)
+    return numpy.frombuffer(a, dtype=dtype)
+
+
+def _numpy_sum(a):
+    # sum of a numpy array, added sequentially (like sum()), so without the rounding differences of numpy.sum
+    # (which matter, as fn shows whole numbers without decimals)
+    if len(a):
+        if a.strides == (0,) and a[0] == 1:  # the broadcast weights of a non weighted monitor
+            return float(len(a))
+        return numpy.cumsum(a)[-1].item()
+    return 0
+
+
 def do_force_numeric(arg):
     result = []
     for v in arg:
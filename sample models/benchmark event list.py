@@ -0,0 +1,30 @@
+# benchmark event list.py
+import salabim as sim
+import time
+
+# compares the event list backends on a hold heavy workload:
+# a large number of components, each holding for an exponentially distributed duration
+
+NUMBER_OF_COMPONENTS = [1_000, 10_000, 100_000]
+NUMBER_OF_HOLDS = 100_000
+
+
+class Holder(sim.Component):
+    def process(self):
+        while True:
+            self.hold(iat.sample())
+
+
+print(f"{'event_list':10} {'components':>10} {'holds/s':>12}")
+for number_of_components in NUMBER_OF_COMPONENTS:
+    for event_list in ("heap", "calendar", "ladder"):
+        env = sim.Environment(trace=False, event_list=event_list)
+        iat = sim.Exponential(number_of_components)
+        for _ in range(number_of_components):
+            Holder()
+        env.run(1)  # all components are scheduled now
+
+        t0 = time.perf_counter()
+        env.run(NUMBER_OF_HOLDS)
+        t1 = time.perf_counter()
+        print(f"{event_list:10} {number_of_components:10d} {NUMBER_OF_HOLDS / (t1 - t0):12.0f}")
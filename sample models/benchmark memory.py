@@ -0,0 +1,28 @@
+# benchmark memory.py
+import salabim as sim
+import tracemalloc
+
+# measures the number of bytes per component that is waiting in a queue
+
+NUMBER_OF_COMPONENTS = 100_000
+
+
+class Customer(sim.Component):
+    def process(self):
+        self.enter(waitingline)
+        self.passivate()
+
+
+for component_monitors in (True, False):
+    env = sim.Environment(trace=False, component_monitors=component_monitors)
+    waitingline = sim.Queue("waitingline")
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(NUMBER_OF_COMPONENTS):
+        Customer()
+    env.run()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"component_monitors={component_monitors!s:5}  bytes per queued component: {(after - before) / NUMBER_OF_COMPONENTS:8.0f}")
@@ -0,0 +1,48 @@
+# benchmark monitor tally.py
+import salabim as sim
+import time
+
+# measures the tally throughput of non level and level monitors, for all types
+# the level monitors are tallied by a component that holds between the tallies (as the time has to advance);
+# the time of the same loop without tallies is subtracted
+# all durations are the best of REPEAT runs
+
+NUMBER_OF_TALLIES = 200_000
+REPEAT = 5
+TYPES = ("any", "bool", "int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64", "float")
+
+
+class Tallier(sim.Component):
+    def setup(self, monitor):
+        self.monitor = monitor
+
+    def process(self):
+        monitor = self.monitor
+        for i in range(NUMBER_OF_TALLIES):
+            self.hold(1)
+            if monitor is not None:
+                monitor.tally(i % 100 + 1)
+
+
+def duration(type):
+    env = sim.Environment(trace=False)
+    monitor = sim.Monitor(type=type)
+    t0 = time.perf_counter()
+    for i in range(NUMBER_OF_TALLIES):
+        monitor.tally(i % 100 + 1)
+    return time.perf_counter() - t0
+
+
+def level_duration(type):
+    env = sim.Environment(trace=False)
+    Tallier(monitor=None if type is None else sim.Monitor(type=type, level=True))
+    t0 = time.perf_counter()
+    env.run()
+    return time.perf_counter() - t0
+
+
+print(f"{'type':8} {'tallies/s':>12} {'level tallies/s':>16}")
+for type in TYPES:
+    non_level = min(duration(type) for _ in range(REPEAT))
+    level = min(level_duration(type) for _ in range(REPEAT)) - min(level_duration(None) for _ in range(REPEAT))
+    print(f"{type:8} {NUMBER_OF_TALLIES / non_level:12.0f} {NUMBER_OF_TALLIES / level:16.0f}")
@@ -0,0 +1,53 @@
+# benchmark store match.py
+import salabim as sim
+import time
+
+# compares from_store with match= (on a keyed store) with the equivalent filter=
+# a store holds NUMBER_OF_ITEMS items, divided over a number of skus; pickers repeatedly take an item of a random sku
+# and put it back (at the tail)
+# few skus means large groups of items with the same key, many skus means small groups
+
+NUMBER_OF_ITEMS = 5_000
+NUMBER_OF_SKUS = [10, 1_000]
+NUMBER_OF_PICKERS = 5
+NUMBER_OF_PICKS = 20_000
+
+
+class Item(sim.Component):
+    def setup(self, sku):
+        self.sku = sku
+
+
+class Picker(sim.Component):
+    def setup(self, use_match):
+        self.use_match = use_match
+
+    def process(self):
+        while True:
+            sku = env.random.randrange(number_of_skus)
+            if self.use_match:
+                item = self.from_store(store, match=sku)
+            else:
+                item = self.from_store(store, filter=lambda item: item.sku == sku)
+            self.hold(1)
+            self.to_store(store, item)
+            picks.append(item)
+            if len(picks) == NUMBER_OF_PICKS:
+                env.main().activate()
+
+
+print(f"{'skus':>6} {'method':7} {'picks/s':>12}")
+for number_of_skus in NUMBER_OF_SKUS:
+    for use_match in (True, False):
+        env = sim.Environment(trace=False, random_seed=1)
+        store = sim.Store(key=(lambda item: item.sku) if use_match else None)
+        for i in range(NUMBER_OF_ITEMS):
+            Item(sku=i % number_of_skus).enter(store)
+        picks = []
+        for _ in range(NUMBER_OF_PICKERS):
+            Picker(use_match=use_match)
+
+        t0 = time.perf_counter()
+        env.run()
+        t1 = time.perf_counter()
+        print(f"{number_of_skus:6d} {'match' if use_match else 'filter':7} {NUMBER_OF_PICKS / (t1 - t0):12.0f}")
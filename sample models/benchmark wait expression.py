@@ -0,0 +1,45 @@
+# benchmark wait expression.py
+import salabim as sim
+import time
+
+# measures the checks of waiters per second, for a large number of components waiting for one state
+# with a $-expression (like "$ >= 10"), compared to the equivalent lambda
+# the value of the state is raised by 1 every time unit, so all remaining waiters are checked on every change
+
+NUMBER_OF_WAITERS = 10_000
+NUMBER_OF_THRESHOLDS = 100
+
+
+class Waiter(sim.Component):
+    def setup(self, threshold, use_expression):
+        self.threshold = threshold
+        self.use_expression = use_expression
+
+    def process(self):
+        if self.use_expression:
+            self.wait((level, f"$ >= {self.threshold}"))
+        else:
+            self.wait((level, lambda value, component, state: value >= component.threshold))
+
+
+class Raiser(sim.Component):
+    def process(self):
+        for value in range(1, NUMBER_OF_THRESHOLDS + 1):
+            self.hold(1)
+            level.set(value)
+
+
+print(f"{'wait value':10} {'checks/s':>12}")
+for use_expression in (True, False):
+    env = sim.Environment(trace=False)
+    level = sim.State("level", value=0)
+    for i in range(NUMBER_OF_WAITERS):
+        Waiter(threshold=i % NUMBER_OF_THRESHOLDS + 1, use_expression=use_expression)
+    Raiser()
+    env.run(0.5)  # all waiters are waiting now
+    number_of_checks = sum(NUMBER_OF_WAITERS * (NUMBER_OF_THRESHOLDS - value) // NUMBER_OF_THRESHOLDS for value in range(NUMBER_OF_THRESHOLDS))
+
+    t0 = time.perf_counter()
+    env.run()
+    t1 = time.perf_counter()
+    print(f"{'$-string' if use_expression else 'lambda':10} {number_of_checks / (t1 - t0):12.0f}")
@@ -176,6 +176,219 @@ def test_monitor_3():
         assert m.number_of_entries_zero() == 2
 
 
+def test_percentile_stats_only():
+    class X(sim.Component):
+        def process(self):
+            for value in range(1, 1001):
+                env.ml.tally(value % 100)
+                env.ml_sketch.tally(value % 100)
+                self.hold(value % 7 + 1)
+
+    env = sim.Environment()
+    m = sim.Monitor(stats_only=True, percentile_error=0.01)
+    m_full = sim.Monitor()
+    for value in range(-500, 1001):
+        m.tally(value)
+        m_full.tally(value)
+    for q in (1, 10, 50, 90, 95, 99):
+        for ex0 in (False, True):
+            assert m.percentile(q, ex0=ex0) == pytest.approx(m_full.percentile(q, ex0=ex0), rel=0.02, abs=1)
+    assert m.percentile(0) == -500
+    assert m.percentile(100) == m.maximum() == 1000
+    assert m.median(ex0=True) == pytest.approx(250, rel=0.01)
+    assert m.bin_number_of_entries(200, 400) == pytest.approx(200, rel=0.05)
+    assert "95% percentile" in m.print_histogram(as_str=True)
+    assert len(m._sketch.positive) < 400  # bounded by the range of the values
+
+    env.ml = sim.Monitor(level=True)
+    env.ml_sketch = sim.Monitor(level=True, stats_only=True, percentile_error=0.001)
+    X()
+    env.run()
+    for q in (5, 50, 95):
+        for ex0 in (False, True):
+            assert env.ml_sketch.percentile(q, ex0=ex0) == pytest.approx(env.ml.percentile(q, ex0=ex0), rel=0.01)
+    assert env.ml_sketch.bin_duration(-1, 49.5) == pytest.approx(env.ml.bin_duration(-1, 49.5))
+
+    m = sim.Monitor(stats_only=True)
+    with pytest.raises(NotImplementedError):
+        m.percentile(50)
+    m.reset(percentile_error=0.05)
+    m.tally(10)
+    m.tally(20, weight=2)
+    assert m.percentile(50) == pytest.approx(20, rel=0.05)
+    with pytest.raises(NotImplementedError):
+        m.bin_number_of_entries(0, 100)  # not available for weighted stats_only monitors
+    with pytest.raises(ValueError):
+        sim.Monitor(stats_only=True, percentile_error=1)
+
+    q = sim.Queue()
+    q.reset_monitors(stats_only=True, percentile_error=0.01)
+    assert q.length_of_stay._sketch is not None
+
+
+def test_histogram_bins():
+    class X(sim.Component):
+        def process(self):
+            for value in range(1, 1001):
+                env.ml.tally(value % 13)
+                env.ml_bins.tally(value % 13)
+                self.hold(value % 7 + 1)
+
+    env = sim.Environment()
+    m = sim.Monitor(stats_only=True, histogram_bins=(10, 0, 5))
+    m_full = sim.Monitor()
+    for value in range(-20, 80):
+        m.tally(value / 2, weight=value % 3 + 1)
+        m_full.tally(value / 2, weight=value % 3 + 1)
+    for lowerbound, upperbound in ((0, 5), (-sim.inf, 0), (10, 35), (45, 50), (50, sim.inf), (-sim.inf, sim.inf)):
+        for ex0 in (False, True):
+            assert m.bin_number_of_entries(lowerbound, upperbound, ex0=ex0) == m_full.bin_number_of_entries(lowerbound, upperbound, ex0=ex0)
+        assert m.bin_weight(lowerbound, upperbound) == m_full.bin_weight(lowerbound, upperbound)
+    assert m.histogram_autoscale() == (5, 0, 10)
+    assert m.print_histogram(as_str=True).splitlines()[-13:] == m_full.print_histogram(10, 0, 5, as_str=True).splitlines()[-13:]
+    assert len(m._bins.counts) == 12
+    with pytest.raises(NotImplementedError):
+        m.bin_weight(1, 5)  # not a bin boundary
+    with pytest.raises(NotImplementedError):
+        m.percentile(50)
+
+    env.ml = sim.Monitor(level=True)
+    env.ml_bins = sim.Monitor(level=True, stats_only=True, histogram_bins=(12, 0, 1))
+    X()
+    env.run()
+    for lowerbound, upperbound in ((-sim.inf, 0), (3, 6), (5, 12), (0, sim.inf)):
+        assert env.ml_bins.bin_duration(lowerbound, upperbound) == pytest.approx(env.ml.bin_duration(lowerbound, upperbound))
+
+    m = sim.Monitor(stats_only=True, histogram_bins=(4, 0, 1), percentile_error=0.01)
+    for value in (0.5, 1.5, 1.5, 2.5):
+        m.tally(value)
+    assert m.bin_number_of_entries(1, 2) == 2
+    assert m.bin_number_of_entries(1.2, 1.8) == 2  # estimated with the sketch
+    m.reset(histogram_bins=())
+    assert m._bins is None
+    with pytest.raises(ValueError):
+        sim.Monitor(stats_only=True, histogram_bins=(0, 0, 1))
+
+
+def test_xweight_cache():
+    env = sim.Environment()
+    m = sim.Monitor()
+    m.tally(1)
+    assert m.number_of_entries() == 1
+    m.tally(3)
+    assert m.number_of_entries() == 2
+    assert m.mean() == 2
+
+    ml = sim.Monitor(level=True)
+    env.run(1)
+    ml.tally(10)
+    assert ml.maximum() == 10
+    ml.tally(20)  # overwrites the value tallied at the same time
+    assert ml.maximum() == 20
+    ml.monitor(False)  # overwrites the value with off
+    assert ml.maximum() == 0
+    env.run(1)
+    assert ml.maximum() == 0
+
+
+def test_numpy_statistics(monkeypatch):
+    pytest.importorskip("numpy")
+
+    def statistics(m):
+        result = [m.print_statistics(as_str=True), m.values()]
+        for ex0 in (False, True):
+            result.extend(m._xweight(ex0=ex0))
+            result.extend(m.percentile(q, ex0=ex0, interpolation=interpolation) for q in (10, 25, 50, 90) for interpolation in ("linear", "lower", "higher", "midpoint"))
+        if m._level:
+            result.extend([m.bin_duration(2, 5), m.value_duration((1, 3))])
+        else:
+            result.extend([m.bin_weight(2, 5), m.bin_number_of_entries(2, 5, ex0=True), m.value_weight((1, 3)), m.value_number_of_entries(3)])
+        return result
+
+    env = sim.Environment()
+    monitors = [
+        sim.Monitor("any"),
+        sim.Monitor("int32", type="int32"),
+        sim.Monitor("float weighted", type="float"),
+        sim.Monitor("any level", level=True),
+        sim.Monitor("uint8 level", level=True, type="uint8"),
+    ]
+    for i in range(200):
+        for m in monitors:
+            value = (i * 7) % 11
+            if m._level:
+                m.tally(value / 2 if m.name() == "any level" else value)
+            else:
+                m.tally(value, weight=i % 3 if m.name() == "float weighted" else 1)
+            if i == 100:
+                m.monitor(False)
+            if i == 120:
+                m.monitor(True)
+            if i % 50 == 0:
+                m.mean()  # tallying is still possible after a (zero-copy) calculation
+        env.run(i % 4)
+
+    for m in monitors:
+        with_numpy = statistics(m)
+        m.cached_xweight.clear()
+        monkeypatch.setattr(sim.salabim, "PyPy", True)  # then, the array.arrays are copied instead of viewed
+        assert statistics(m) == with_numpy
+        if m.xtypecode:
+            assert m._numpy_x().flags.owndata
+        m.cached_xweight.clear()
+        monkeypatch.setattr(sim.salabim, "has_numpy", lambda: False)
+        without_numpy = statistics(m)
+        monkeypatch.undo()
+        assert with_numpy == without_numpy
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_sorted_xweight_cache(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(sim.salabim, "has_numpy", lambda: False)
+    env = sim.Environment()
+    m = sim.Monitor(type="int32")
+    for value in (5, 1, 4, 2, 3):
+        m.tally(value)
+    assert m.median() == 3
+    assert m.bin_number_of_entries(1, 4) == 3
+    assert m.bin_number_of_entries(4, 1) == 0
+    m.tally(10)  # the sorted view is rebuilt on the next query
+    assert m.median() == 3.5
+    assert m.percentile(100) == 10
+    assert m.bin_weight(3, 100) == 3
+
+    m = sim.Monitor()
+    for value in (1, 2.5, 0, 2):
+        m.tally(value, weight=2)
+    assert m.percentile(50, interpolation="lower") == 1
+    assert repr(m.percentile(70)) == "2"  # the tallied value itself, also with numpy
+    assert m.bin_number_of_entries(0, 2, ex0=True) == 2
+
+    m = sim.Monitor()
+    for value in (3, 2.0, 1, 2):
+        m.tally(value)
+    assert repr(m.percentile(50, interpolation="lower")) == "2.0"  # equal values in the order of tallying
+    assert repr(m.percentile(50, interpolation="higher")) == "2"
+
+    ml = sim.Monitor(level=True, initial_tally=1)
+    env.run(2)
+    ml.tally(3)
+    env.run(1)
+    assert ml.median() == 1
+    assert ml.bin_duration(0, 2) == 2
+    env.run(2)  # the duration of 3 grows
+    assert ml.median() == 3
+    assert ml.bin_duration(2, 3) == 3
+    ml.tally(2)
+    ml.monitor(False)  # overwrites the value at the same time with off
+    env.run(10)
+    assert ml.median() == 3
+    assert ml.bin_duration(1.5, 2) == 0
+
+
 def test_monitor4():
     class X(sim.Component):
         def setup(self, stats_only=False):
@@ -22,5 +22,194 @@ def test_1(capsys):
     assert "no events left" in out
 
 
+def test_cancel_and_reschedule():
+    class X(sim.Component):
+        def process(self):
+            self.env.order.append(self)
+
+    env = sim.Environment()
+    env.order = []
+    x = [X(name="x.", at=i, priority=-i) for i in range(1000)]
+    for c in x[::2]:
+        c.cancel()
+    assert len(env._event_list) == 500
+    assert x[1].scheduled_priority() == -1
+    assert x[0].scheduled_priority() is None
+    x[3].activate(at=2000, priority=5)
+    assert x[3].scheduled_priority() == 5
+    x[5].remaining_duration(0.5)
+    env.run()
+    assert env.order == [x[5], x[1]] + x[7::2] + [x[3]]
+    assert env.now() == 2000
+
+
+@pytest.mark.parametrize("event_list", ["heap", "calendar", "ladder"])
+def test_event_list(event_list):
+    class X(sim.Component):
+        def process(self):
+            while True:
+                self.env.order.append((self.env.now(), self))
+                if self.env.now() > 1000:
+                    return
+                self.hold(sim.Exponential(10)(), priority=sim.IntUniform(-1, 1)(), urgent=sim.Pdf((False, True), (0.8, 0.2))())
+                if sim.Uniform(0, 1)() < 0.1:
+                    other = sim.Pdf(self.env.xs, 1)()
+                    if other.isscheduled():
+                        other.cancel() if sim.Uniform(0, 1)() < 0.5 else other.activate(delay=sim.Uniform(0, 5)())
+                    self.env.peek()
+
+    def run(event_list):
+        env = sim.Environment(event_list=event_list, random_seed=1)
+        env.order = []
+        env.xs = [X() for _ in range(200)]
+        env.run()
+        return [(t, c.name()) for t, c in env.order]
+
+    result = run(event_list)
+    assert len(result) > 1000
+    assert [t for t, _ in result] == sorted(t for t, _ in result)
+    assert result == run("heap")
+
+    with pytest.raises(ValueError):
+        sim.Environment(event_list="nonexistent")
+
+
+@pytest.mark.parametrize("event_list", ["heap", "calendar", "ladder"])
+def test_timeouts(event_list, monkeypatch):
+    class Customer(sim.Component):
+        def process(self):
+            patience = sim.Pdf((0, 1, 2, 20, 50), 1)()
+            deadline = self.env.now() + patience
+            self.request(self.env.clerks, fail_delay=patience)
+            self.env.order.append((self.env.now(), self.name(), self.failed()))
+            if self.failed():
+                assert self.env.now() == deadline
+            else:
+                assert self.env.now() <= deadline
+                self.hold(sim.Exponential(5)())
+
+    def run(event_list):
+        env = sim.Environment(event_list=event_list, random_seed=1)
+        env.order = []
+        env.clerks = sim.Resource(capacity=3)
+        sim.ComponentGenerator(Customer, iat=sim.Exponential(1))
+        env.run(500)
+        return env.order
+
+    result = run(event_list)
+    assert len(result) > 400
+    assert 0 < sum(failed for _, _, failed in result) < len(result)
+    assert [t for t, _, _ in result] == sorted(t for t, _, _ in result)
+    with monkeypatch.context() as m:
+        m.setattr(sim.salabim._TimeoutWheel, "push", lambda self, entry, now: False)  # timeouts directly on the event list
+        assert result == run(event_list)
+
+
+def test_timeout_flushed_and_cancelled():
+    class Releaser(sim.Component):
+        def process(self):
+            self.request(clerk)
+            self.hold(10)
+            assert len(env._timeouts) == 0  # the bucket of the timeout at t=10 has been moved to the event list
+            assert len(env._event_list) == 1
+            self.release()
+
+    class Customer(sim.Component):
+        def process(self):
+            self.request(clerk, fail_at=10)
+            order.append((env.now(), self.failed()))
+            self.hold(5)
+            order.append((env.now(), self.failed()))
+
+    env = sim.Environment()
+    order = []
+    clerk = sim.Resource("clerk")
+    Releaser()
+    Customer(at=1)  # so the timeout is scheduled after the hold of the releaser
+    env.run()
+    assert order == [(10, False), (15, False)]  # the timeout was cancelled on the event list
+
+
+def test_fast_step_loop(capsys):
+    class X(sim.Component):
+        def process(self):
+            self.hold(5)
+            self.env.trace(True)
+            self.hold(5)
+
+    class Y(sim.Component):
+        def process(self):
+            self.hold(20)
+            self.standby()
+            self.env.order.append(self.env.now())
+
+    class Z(sim.Component):
+        def process(self):
+            self.hold(30)
+
+    env = sim.Environment()
+    env.order = []
+    X()
+    Y()
+    Z(name="z")
+    env.run(15)
+    out = capsys.readouterr()[0]
+    assert "x.0 current" not in out
+    assert "x.0 ended" in out
+    env.trace(False)
+    env.run()
+    assert env.order == [30]
+    assert env.now() == 30
+
+
+@pytest.mark.parametrize("trace", [False, True])
+def test_schedule(trace):
+    class X(sim.Component):
+        def process(self):
+            self.env.order.append(("x", self.env.now()))
+            self.passivate()
+            self.env.order.append(("x", self.env.now()))
+
+    env = sim.Environment(trace=trace)
+    env.order = []
+    x = X()
+    env.schedule(env.order.append, ("a", 5), delay=5)
+    env.schedule(env.order.append, ("b", 5), at=5, urgent=True)
+    cancelled = env.schedule(env.order.append, ("c", 3), at=3)
+    assert cancelled.isscheduled()
+    assert cancelled.scheduled_time() == 3
+    env.schedule(cancelled.cancel, at=2)
+    env.schedule(x.activate, at=4)
+    env.run()
+    assert env.order == [("x", 0), ("x", 4), ("b", 5), ("a", 5)]
+    assert not cancelled.isscheduled()
+    assert env.now() == 5
+    with pytest.raises(ValueError):
+        env.schedule(print, at=1)
+
+
+def test_component_monitors():
+    class X(sim.Component):
+        def process(self):
+            self.hold(1, mode="holding")
+            self.passivate()
+
+    env = sim.Environment(component_monitors=False)
+    x = X()
+    env.run(0.5)
+    assert x.status() == sim.scheduled
+    assert x.status.value == sim.scheduled
+    assert x.mode() == "holding"
+    x.mode.value = "abc"
+    assert x.mode() == "abc"
+    env.run()
+    assert x.ispassive()
+    x.reset_monitors()
+    with pytest.raises(ValueError):
+        x.status.value = sim.current
+    with pytest.raises(AttributeError):
+        x.status.print_histogram()
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
@@ -46,6 +46,24 @@ def test_queue_reversed():
     assert collect == [x[9], x[8], x[7], x[6], x[5], x[12], x[13], x[1], x[11], x[3], x[4], x[0]]
 
 
+def test_queue_iter_abandoned():
+    env = sim.Environment()
+    x = [sim.Component(name="x.") for _ in range(6)]
+    q = sim.Queue("q", fill=x[:3])
+    abandoned = [iter(q) for _ in range(100)]
+    for it in abandoned:
+        next(it)
+    it0 = abandoned[0]
+    x[3].enter(q)
+    x[1].leave(q)
+    assert list(it0) == [x[2], x[3]]
+    it1 = iter(q)
+    assert next(it1) == x[0]
+    x[4].enter_at_head(q)
+    x[5].enter(q)
+    assert list(it1) == [x[4], x[2], x[3], x[5]]
+
+
 def test_queue_operations():
     env = sim.Environment()
     x = [sim.Component(name="x.") for _ in range(9)]
@@ -79,6 +97,36 @@ def test_queue_operations():
     assert q0 == x
 
 
+def test_queue_bulk_operations():
+    class X(sim.Component):
+        def process(self):
+            self.hold(self.sequence_number())
+            self.enter(q0)
+
+    env = sim.Environment()
+    q0 = sim.Queue("q0")
+    x = [X(name="x.") for _ in range(300)]
+    env.run(500)
+    q1 = sim.Queue("q1", fill=x[250:])
+    assert q1.index(x[260]) == 10
+    q1.extend(q0)
+    assert q1 == x[250:] + x[:250]
+    assert q1[260] == x[210]
+    assert [c.index(q1) for c in x[:3]] == [50, 51, 52]
+    assert q1.length() == 300
+    assert q1.number_of_arrivals == 300
+    q2 = q0.move()
+    assert q2 == x
+    assert q0.length() == 0
+    assert q0.length_of_stay.number_of_entries() == 300
+    assert q0.length_of_stay.mean() == pytest.approx(500 - 149.5)
+    assert q0.number_of_departures == 300
+    assert all(q0 not in c.queues() for c in x)
+    env.run(1000)
+    assert q0.length.mean() == pytest.approx(sum(500 - t for t in range(300)) / 1500)
+    assert q2.length() == 300
+
+
 def test_queue_comparisons():
     env = sim.Environment()
     x = [sim.Component(name="x.") for _ in range(9)]
@@ -138,8 +186,60 @@ def test_queue_priorities_update():
     for i, c in enumerate(q):
         c.priority(q, -i)
     assert list(q) == x
-    
-    
+
+
+def test_queue_priorities_index():
+    env = sim.Environment()
+    x = [sim.Component(name="x.") for _ in range(12)]
+    q = sim.Queue("q")
+    for i, c in enumerate(x[:8]):
+        c.enter_sorted(q, priority=i % 3)
+    assert list(q) == [x[0], x[3], x[6], x[1], x[4], x[7], x[2], x[5]]
+    x[3].leave(q)
+    x[7].priority(q, 0)
+    x[8].enter_sorted(q, priority=0)
+    x[9].enter_sorted(q, priority=1.5)
+    x[10].enter_at_head(q)
+    assert list(q) == [x[10], x[0], x[6], x[7], x[8], x[1], x[4], x[9], x[2], x[5]]
+    assert [c.priority(q) for c in q] == [0, 0, 0, 0, 0, 1, 1, 1.5, 2, 2]
+
+    # an unsorted queue (possible with insert) should still follow the linear search rules
+    q.insert(len(q), x[11])
+    assert x[11].priority(q) == 0
+    x[0].priority(q, 1)
+    assert list(q)[:6] == [x[10], x[6], x[7], x[8], x[1], x[4]]
+    assert x[0].index(q) == 6
+
+
+def test_queue_positions():
+    env = sim.Environment()
+    x = [sim.Component(name="x.") for _ in range(1000)]
+    q = sim.Queue("q", fill=x[:800])
+    assert q[0] == x[0]
+    assert q[-1] == x[799]
+    assert q[500] == x[500]
+    assert q[10:20] == x[10:20]
+    assert q[700:600:-7] == x[700:600:-7]
+    assert q[::-1] == x[799::-1]
+    for c in x[:800:3]:
+        c.leave(q)
+    expected = [c for c in x[:800] if c not in x[:800:3]]
+    for c in x[800:900]:
+        q.insert(250, c)
+        expected.insert(250, c)
+    x[900].enter_sorted(q, -1)
+    expected.insert(0, x[900])
+    x[5].priority(q, 1)
+    expected.remove(x[5])
+    expected.append(x[5])
+    assert list(q) == expected
+    assert [q[i] for i in range(len(q))] == expected
+    assert [c.index(q) for c in expected] == list(range(len(expected)))
+    assert q.index(x[0]) == -1
+    assert q.pop(100) == expected.pop(100)
+    assert q[100] == expected[100]
+
+
 def test_queue_capacity():
     class X(sim.Component):
         pass
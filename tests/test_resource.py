@@ -0,0 +1,243 @@
+import salabim as sim
+import pytest
+
+
+def test_release_skips_large_requests():
+    env = sim.Environment()
+    honored = []
+
+    class X(sim.Component):
+        def setup(self, quantity, request_priority=0):
+            self.quantity = quantity
+            self.request_priority = request_priority
+
+        def process(self):
+            self.request((r, self.quantity, self.request_priority))
+            honored.append(self.name())
+            self.passivate()
+
+    r = sim.Resource("r", capacity=0)
+    X("big", quantity=10)
+    X("a", quantity=1)
+    X("b", quantity=2)
+    X("c", quantity=1, request_priority=-1)
+    X("d", quantity=3)
+    X("e", quantity=1)
+    env.run(1)
+    assert honored == []
+    r.set_capacity(4)
+    env.run(1)
+    assert honored == ["c", "a", "b"]
+    assert [c.name() for c in r.requesters()] == ["big", "d", "e"]
+    r.set_capacity(20)
+    env.run(1)
+    assert honored == ["c", "a", "b", "big", "d", "e"]
+    assert len(r.requesters()) == 0
+
+
+def test_anonymous_bulk_release():
+    env = sim.Environment()
+    honored = []
+
+    class X(sim.Component):
+        def setup(self, quantity):
+            self.quantity = quantity
+
+        def process(self):
+            if self.quantity > 0:
+                self.get((r, self.quantity))
+            else:
+                self.put((r, -self.quantity))
+            honored.append(self.name())
+
+    r = sim.Resource("r", capacity=10, initial_claimed_quantity=10, anonymous=True)
+    X("huge", quantity=100)
+    for i in range(20):
+        X(f"g{i}", quantity=1)
+    env.run(1)
+    r.release(5)
+    env.run(1)
+    assert honored == [f"g{i}" for i in range(5)]
+    X("p", quantity=-3)  # a put is only possible if enough is claimed
+    X("g", quantity=1)
+    env.run(1)
+    assert honored[5:] == ["p", "g", "g5", "g6"]
+    assert r.claimed_quantity() == 10
+    assert len(r.requesters()) == 14
+
+
+def test_multiple_resources():
+    env = sim.Environment()
+    honored = []
+
+    class X(sim.Component):
+        def setup(self, resources):
+            self.resources = resources
+
+        def process(self):
+            self.request(*self.resources)
+            honored.append(self.name())
+            self.passivate()
+
+    crew = sim.Resource("crew", capacity=0)
+    truck = sim.Resource("truck", capacity=0)
+    crane = sim.Resource("crane", capacity=0)
+    X("x", resources=(crew, truck, crane))
+    X("y", resources=(crew, truck))
+    env.run(1)
+    crew.set_capacity(1)
+    env.run(1)
+    assert honored == []
+    truck.set_capacity(1)
+    env.run(1)
+    assert honored == ["y"]
+    assert [c.name() for c in crane.requesters()] == ["x"]
+    crew.set_capacity(2)
+    truck.set_capacity(2)
+    X("z", resources=(crew,))  # takes the crew, so x is blocked by the crew again
+    env.run(1)
+    assert honored == ["y", "z"]
+    crane.set_capacity(1)
+    env.run(1)
+    assert honored == ["y", "z"]
+    crew.set_capacity(3)
+    env.run(1)
+    assert honored == ["y", "z", "x"]
+    assert len(crew.requesters()) == len(truck.requesters()) == len(crane.requesters()) == 0
+
+    p = X("p", resources=(crew, truck))
+    q = X("q", resources=(crew, truck))
+    env.run(1)
+    q.priority(crew.requesters(), -1)
+    truck.set_capacity(3)
+    crew.set_capacity(4)  # q is now in front of p in the crew requesters
+    env.run(1)
+    assert honored[3:] == ["q"]
+
+
+def test_capacity_schedule():
+    env = sim.Environment()
+    honored = []
+
+    class X(sim.Component):
+        def process(self):
+            self.request(r)
+            honored.append(env.now())
+            self.passivate()
+
+    r = sim.Resource("r", capacity_schedule=[(0, 0), (8, 2), (16, 0)], capacity_schedule_cycle=24)
+    assert r.capacity() == 0
+    for _ in range(3):
+        X()
+    env.run(10)
+    assert r.capacity() == 2
+    assert honored == [8, 8]
+    env.run(24)
+    assert r.capacity() == 2  # t=34
+    assert honored == [8, 8]  # the claims are never released
+    env.run(10)
+    assert r.capacity() == 0  # t=44
+    assert r.capacity.mean() == pytest.approx(2 * 16 / 44)
+
+    t0 = env.now()
+    store = sim.Store("store", capacity=1, capacity_schedule=((t0 + 5, 3), (t0 + 10, 2)))
+    assert store.capacity() == 1
+    env.run(6)
+    assert store.capacity() == 3
+    store.set_capacity_schedule(((env.now() + 1, 4),))
+    env.run(10)
+    assert store.capacity() == 4  # the change to 2 is cancelled
+    store.set_capacity_schedule([(0, 1)])  # applied immediately
+    assert store.capacity() == 1
+    store.set_capacity_schedule()
+    assert store._capacity_schedule is None
+
+    class Y(sim.Component):
+        def process(self):
+            self.request(r1)
+            self.passivate()
+
+    r1 = sim.Resource("r1", capacity=0)
+    for _ in range(5):
+        Y()
+    env.run(till=70)
+    r1.set_capacity_schedule([(0, 0), (8, 5), (16, 1)], cycle=24)  # mid cycle: only the current capacity is applied
+    assert r1.capacity() == 1
+    env.run(till=71)
+    assert r1.claimed_quantity() == 1  # earlier changes of the cycle are not replayed
+    env.run(till=75)
+    assert r1.capacity() == 0
+    env.run(till=80)
+    assert r1.capacity() == 5
+    env.run(till=90)
+    assert r1.capacity() == 1
+
+    with pytest.raises(ValueError):
+        sim.Resource(capacity_schedule=[(0, 1), (10, 2)], capacity_schedule_cycle=10)
+    with pytest.raises(ValueError):
+        sim.Queue(capacity_schedule=[(10, 1), (0, 2)])
+
+
+def _anonymous_multiple_resources_model(unwatched):
+    env = sim.Environment(random_seed=16)
+    honored = []
+
+    class Getter(sim.Component):
+        def process(self):
+            self.request(*[(r, 1) for r in env.random.sample(resources, env.random.randint(1, 3))])
+            honored.append((env.now(), self.name()))
+
+    class Putter(sim.Component):
+        def process(self):
+            self.request(*[(r, -1) for r in env.random.sample(resources, env.random.randint(1, 3))])
+
+    resources = [sim.Resource(f"r{i}", capacity=2, anonymous=True, initial_claimed_quantity=2) for i in range(4)]
+    if unwatched:
+        # requests for several resources are then visited by all of their resources, like single requests
+        add_requester = sim.Resource._add_requester
+
+        def _add_requester(r, c):
+            c._watchable_request = False
+            c._watched_resource = None
+            add_requester(r, c)
+
+        sim.Resource._add_requester = _add_requester
+    try:
+        for i in range(100):
+            env.run(env.random.uniform(0, 1))
+            env.random.choice((Getter, Putter))()
+        env.run()
+    finally:
+        if unwatched:
+            sim.Resource._add_requester = add_requester
+    return honored
+
+
+def test_multiple_anonymous_resources():
+    env = sim.Environment()
+    honored = []
+
+    class X(sim.Component):
+        def setup(self, requests):
+            self.requests = requests
+
+        def process(self):
+            self.request(*self.requests)
+            honored.append(self.name())
+
+    r1 = sim.Resource("r1", capacity=1, anonymous=True, initial_claimed_quantity=1)
+    r2 = sim.Resource("r2", capacity=1, anonymous=True, initial_claimed_quantity=1)
+    X("a", requests=((r2, 1), (r1, 1)))  # watched by r2 only
+    env.run(1)
+    X("b", requests=((r1, 1),))
+    env.run(1)
+    X("put", requests=((r1, -1), (r2, -1)))  # frees r1 and r2 at once, so a is first
+    env.run(1)
+    assert honored == ["put", "a"]
+    assert len(r1.requesters()) == 1
+
+    assert _anonymous_multiple_resources_model(unwatched=False) == _anonymous_multiple_resources_model(unwatched=True)
+
+
+if __name__ == "__main__":
+    pytest.main(["-vv", "-s", __file__])
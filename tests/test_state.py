@@ -122,5 +122,185 @@ def test_value():
     assert s1()==2
 
 
+def test_wait_expression():
+    env = sim.Environment()
+    woken = []
+
+    class W(sim.Component):
+        def setup(self, condition, all=False):
+            self.condition = condition
+            self.all = all
+            self.ok_colors = ("red", "yellow")
+
+        def process(self):
+            self.wait((light, self.condition), all=self.all)
+            woken.append((env.now(), self.name()))
+
+    light = sim.State("light", value="green")
+    W("any", condition="$ in self.ok_colors")
+    W("all", condition="$ in self.ok_colors", all=True)
+    W("red", condition='$ == "red"')
+    env.run(1)
+    light.set("yellow")
+    env.run(1)
+    assert woken == [(1, "any"), (1, "all")]
+    light.set("red")
+    env.run(1)
+    assert woken[2:] == [(2, "red")]
+
+    with pytest.raises(SyntaxError):
+        W("wrong", condition="$ in in")
+        env.run(1)
+
+    wait_expression = sim.salabim._WaitExpression
+    assert wait_expression("$ > 0") is wait_expression("$ > 0")
+    for i in range(2000):
+        wait_expression(f"$ > {i}")
+    assert wait_expression.__new__.cache_info().currsize == 1024  # the cache is bounded
+
+
+def test_wait_order():
+    env = sim.Environment()
+    woken = []
+
+    class W(sim.Component):
+        def setup(self, value, request_priority=0):
+            self.value = value
+            self.request_priority = request_priority
+
+        def process(self):
+            self.wait((light, self.value), request_priority=self.request_priority)
+            woken.append(self.name())
+
+    light = sim.State("light", value="off")
+    W("red0", value="red")
+    W("green0", value="green")
+    W("expression", value='$ != "off"')
+    W("red1", value="red")
+    W("red2", value="red", request_priority=-1)
+    W("function", value=lambda value, component, state: value == "red")
+    W("red3", value="red")
+    W("red_or_green", value="red")
+    env.run(1)
+    light.waiters()[-1].priority(light.waiters(), -2)
+    light.trigger("red", max=4)
+    env.run(1)
+    assert woken == ["red_or_green", "red2", "red0", "expression"]
+    light.set("green")
+    env.run(1)
+    assert woken[4:] == ["green0"]
+    light.set("red")
+    env.run(1)
+    assert woken[5:] == ["red1", "function", "red3"]
+    assert len(light.waiters()) == 0
+
+
+def test_wait_for_tracked():
+    env = sim.Environment()
+    evaluations = []
+    woken = []
+
+    def cond():
+        evaluations.append(env.now())
+        return mode() == "auto" and (level.value() > 5 or backup.get())  # backup is only read if level <= 5
+
+    class W(sim.Component):
+        def process(self):
+            self.wait_for(cond)
+            woken.append(env.now())
+
+    class Setter(sim.Component):
+        def process(self):
+            self.hold(1)
+            unrelated.set(1)
+            level.set(3)  # not read by cond yet
+            mode.set("auto")
+            self.hold(1)
+            level.set(4)
+            backup.set("")
+            level.set(5)
+            self.hold(1)
+            mode.set("manual")
+            self.hold(1)
+            level.set(6)  # not read by cond anymore
+            self.hold(1)
+            mode.set("auto")
+
+    mode = sim.State("mode", value="manual")
+    level = sim.State("level", value=0)
+    backup = sim.State("backup", value=False)
+    unrelated = sim.State("unrelated", value=0)
+    W()
+    Setter()
+    env.run(2.5)
+    assert evaluations == [0, 1, 2]  # level and backup changed at t=2, but cond is evaluated just once
+    assert [len(state.waiters()) for state in (mode, level, backup, unrelated)] == [1, 1, 1, 0]
+    env.run(1)
+    assert evaluations == [0, 1, 2, 3]
+    assert [len(state.waiters()) for state in (mode, level, backup, unrelated)] == [1, 0, 0, 0]
+    env.run()
+    assert evaluations == [0, 1, 2, 3, 5]
+    assert woken == [5]
+    assert all(len(state.waiters()) == 0 for state in (mode, level, backup, unrelated))
+
+    class X(sim.Component):
+        def process(self):
+            with pytest.raises(TypeError):
+                self.wait_for(lambda: False)
+
+    X()
+    env.run()
+
+
+def test_batch_state_updates():
+    env = sim.Environment()
+    woken = []
+    checks = []
+
+    def both(value, component, state):
+        checks.append(env.now())
+        return north() == east() == "green"
+
+    class W(sim.Component):
+        def setup(self, waits, all=False):
+            self.waits = waits
+            self.all = all
+
+        def process(self):
+            self.wait(*self.waits, all=self.all)
+            woken.append((env.now(), self.name()))
+
+    north = sim.State("north", value="red")
+    east = sim.State("east", value="green")
+    W("north_green", waits=[(north, "green")])
+    W("both", waits=[(north, both), (east, both)])
+    W("all", waits=[(north, "green"), (east, "green")], all=True)
+    env.run(1)
+    assert checks == [0, 0]  # a check calls both functions
+    with env.batch_state_updates():
+        north.set("green")
+        east.set("red")
+        with env.batch_state_updates():
+            north.set("red")  # north_green is not honored on this intermediate value
+        assert checks == [0, 0]
+    assert checks == [0, 0, 1, 1]  # both is checked once, although it waits for two changed states
+    env.run(1)
+    assert woken == []
+    with env.batch_state_updates():
+        north.set("green")
+        east.set("green")
+    env.run(1)
+    assert woken == [(2, "north_green"), (2, "both"), (2, "all")]
+
+    W("red", waits=[(north, "red")])
+    env.run(1)
+    with pytest.raises(ZeroDivisionError):
+        with env.batch_state_updates():
+            north.set("red")
+            1 / 0
+    env.run(1)
+    assert woken[3:] == [(4, "red")]  # the waiters are checked, although the batch was left with an exception
+
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])
@@ -13,5 +13,183 @@ def test_define():
     X()
     env.run()
 
+
+def test_match():
+    env = sim.Environment()
+
+    class Item(sim.Component):
+        def setup(self, sku):
+            self.sku = sku
+
+    class Picker(sim.Component):
+        def setup(self, sku, filter=lambda item: True):
+            self.sku = sku
+            self.filter = filter
+
+        def process(self):
+            item = self.from_store(store, match=self.sku, filter=self.filter)
+            picked.append((env.now(), self.name(), item.name()))
+
+    class Plain(sim.Component):
+        def process(self):
+            with pytest.raises(ValueError):
+                self.from_store(plain_store, match="a")
+
+    store = sim.Store("store", key=lambda item: item.sku)
+    plain_store = sim.Store("plain_store")
+    assert store.key() is not None
+    assert plain_store.key() is None
+    picked = []
+    a0 = Item("a0", sku="a")
+    b0 = Item("b0", sku="b")
+    a1 = Item("a1", sku="a")
+    store.extend([a0, b0, a1])
+    Picker("pa", sku="a")
+    Picker("pb", sku="b")
+    Picker("pc", sku="c")
+    Picker("pa1", sku="a", filter=lambda item: item.name() != "a2")
+    Picker("pa2", sku="a")
+    Plain()
+    env.run(1)
+    assert picked == [(0, "pa", "a0"), (0, "pb", "b0"), (0, "pa1", "a1")]
+    assert len(store.from_store_requesters()) == 2
+    a2 = Item("a2", sku="a")
+    a2.enter(store)
+    c0 = Item("c0", sku="c")
+    c0.enter(store)
+    env.run(2)
+    assert picked[3:] == [(1, "pa2", "a2"), (1, "pc", "c0")]
+    assert len(store) == 0
+    assert len(store.from_store_requesters()) == 0
+
+
+def test_match_store_order():
+    env = sim.Environment()
+
+    class Item(sim.Component):
+        def setup(self, sku):
+            self.sku = sku
+
+    class Picker(sim.Component):
+        def process(self):
+            picked.append(self.from_store(store, match="a").name())
+            picked.append(self.from_store(plain_store, filter=lambda item: item.sku == "a").name())
+
+    store = sim.Store("store", key=lambda item: item.sku)
+    plain_store = sim.Store("plain_store")
+    picked = []
+    for s in (store, plain_store):
+        a0 = Item("a0", sku="a")
+        a1 = Item("a1", sku="a")
+        a2 = Item("a2", sku="a")
+        b0 = Item("b0", sku="b")
+        a0.enter(s)
+        b0.enter(s)
+        a1.enter_at_head(s)
+        a2.enter_in_front_of(s, a1)
+    Picker()
+    env.run(1)
+    assert picked == ["a2", "a2"]
+    Picker()
+    env.run(1)
+    assert picked[2:] == ["a1", "a1"]
+
+
+def test_key_order():
+    env = sim.Environment(random_seed=11)
+
+    class Item(sim.Component):
+        def setup(self, sku):
+            self.sku = sku
+
+    store = sim.Store("store", key=lambda item: item.sku)
+    items = [Item(sku=i % 3) for i in range(40)]
+    for i in range(2000):
+        item = env.random.choice(items)
+        action = env.random.randrange(7)
+        if item in store:
+            if action == 0:
+                item.leave(store)
+            elif action == 1:
+                item.priority(store, env.random.randrange(5))
+            elif action == 2:
+                item.sku = env.random.randrange(3)
+                store.rescan(items=[item])
+        elif len(store) and action == 3:
+            item.enter_in_front_of(store, env.random.choice(list(store)))
+        elif len(store) and action == 4:
+            item.enter_behind(store, env.random.choice(list(store)))
+        elif action == 5:
+            item.enter_at_head(store)
+        elif action == 6:
+            item.enter_sorted(store, env.random.randrange(5))
+        else:
+            item.enter(store)
+        for sku in range(3):
+            assert list(store._items_with_key(sku)) == [item for item in store if item.sku == sku]
+
+
+def test_rescan_items():
+    env = sim.Environment()
+
+    class Item(sim.Component):
+        def setup(self, zone):
+            self.zone = zone
+
+    class Picker(sim.Component):
+        def setup(self, zone):
+            self.zone = zone
+
+        def process(self):
+            item = self.from_store(store, filter=lambda item: item.zone == self.zone)
+            picked.append((env.now(), self.name(), item.name()))
+
+    class KeyedPicker(Picker):
+        def process(self):
+            item = self.from_store(keyed_store, match=self.zone)
+            picked.append((env.now(), self.name(), item.name()))
+
+    store = sim.Store("store")
+    keyed_store = sim.Store("keyed_store", key=lambda item: item.zone)
+    picked = []
+    items = [Item(f"i{zone}", zone=zone) for zone in range(4)]
+    store.extend(items)
+    keyed_items = [Item(f"k{zone}", zone=zone) for zone in range(4)]
+    keyed_store.extend(keyed_items)
+    Picker("p", zone=9)
+    KeyedPicker("kp", zone=9)
+    env.run(1)
+    assert picked == []
+
+    items[2].zone = 9
+    store.rescan(items=[items[1]])
+    env.run(1)
+    assert picked == []
+    store.rescan(items=[items[1], items[2]])
+    env.run(1)
+    assert picked == [(2, "p", "i2")]
+
+    keyed_items[0].zone = 9
+    keyed_items[3].zone = 9
+    keyed_store.changed(keyed_items[3])
+    keyed_store.changed(keyed_items[0])
+    env.run(1)
+    assert picked[1:] == [(3, "kp", "k3")]
+    assert keyed_store == [keyed_items[0], keyed_items[1], keyed_items[2]]
+    KeyedPicker("kp1", zone=9)
+    env.run(1)
+    assert picked[2:] == [(4, "kp1", "k0")]
+
+    keyed_store.clear()
+    a0 = Item("a0", zone="a")
+    a1 = Item("a1", zone="a")
+    keyed_store.extend([a0, a1])
+    keyed_store.rescan(items=[a0])  # the key of a0 didn't change, so a0 is still the first item with key a
+    keyed_store.rescan()
+    assert list(keyed_store._items_with_key("a")) == [a0, a1]
+    KeyedPicker("kpa", zone="a")
+    env.run(1)
+    assert picked[3:] == [(5, "kpa", "a0")]
+
 if __name__ == "__main__":
     pytest.main(["-vv", "-s", __file__])